@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .upsert import insert_ignore
+
+# Version del catalogo (modulos, lecciones, quizzes, diccionario).
+# Se guarda en la tabla catalog_meta para que todos los workers la vean;
+# cada proceso la relee a lo mas cada CATALOG_VERSION_TTL segundos,
+# asi que validar un ETag casi nunca toca la BD.
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "5"))
+
+_version = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def bump_version(db: Session):
+    """
+    Sube la version del catalogo dentro de la transaccion actual.
+    Los create_* de app/crud la llaman antes de su commit(); el cache de
+    la version se tira hasta que ese commit termina (ver _after_commit).
+    """
+    if not _increment(db):
+        # Primera vez: creamos la fila (sin chocar si otro worker la crea
+        # al mismo tiempo) y volvemos a sumar
+        insert_ignore(db, models.CatalogMeta, [{"id": 1, "version": 0}])
+        _increment(db)
+    db.info["catalog_changed"] = True
+
+
+def _increment(db: Session) -> int:
+    return db.query(models.CatalogMeta)\
+        .filter(models.CatalogMeta.id == 1)\
+        .update({models.CatalogMeta.version: models.CatalogMeta.version + 1})
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(db: Session):
+    # Invalidar antes del commit dejaba que otra peticion releyera la
+    # version vieja y la guardara en cache otros CATALOG_VERSION_TTL segundos
+    if db.info.pop("catalog_changed", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(db: Session):
+    db.info.pop("catalog_changed", None)
+
+
+def invalidate():
+    """Obliga a releer la version en la siguiente consulta."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+def _read_version(db: Session) -> int:
+    return db.query(models.CatalogMeta.version)\
+        .filter(models.CatalogMeta.id == 1)\
+        .scalar() or 0
+
+
+def get_version(db: Session = None) -> int:
+    """
+    Version actual del catalogo (cacheada por CATALOG_VERSION_TTL).
+    Si se pasa la sesion de la peticion la relee con ella; dentro de
+    AsyncSession.run_sync eso va por la conexion async y no bloquea el loop.
+    """
+    global _version, _checked_at
+    now = time.monotonic()
+    if _version is not None and now - _checked_at < CATALOG_VERSION_TTL:
+        return _version
+    if db is not None:
+        # Sin el lock: en el loop async otra corrutina del mismo hilo que
+        # esperara el lock lo trabaria todo. Releer dos veces no hace dano.
+        _version = _read_version(db)
+        _checked_at = time.monotonic()
+        return _version
+    with _lock:
+        if _version is None or now - _checked_at >= CATALOG_VERSION_TTL:
+            db = SessionLocal()
+            try:
+                _version = _read_version(db)
+            finally:
+                db.close()
+            _checked_at = time.monotonic()
+    return _version
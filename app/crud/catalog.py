@@ -0,0 +1,118 @@
+from sqlalchemy.orm import Session, selectinload
+import gzip
+import threading
+from .. import models, schemas, catalog
+
+try:
+    import brotli # opcional, si no esta instalado solo servimos gzip
+except ImportError:
+    brotli = None
+
+# Snapshot del catalogo completo ya serializado y comprimido.
+# Se construye una vez por version del catalogo y despues solo se copian bytes.
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _build_snapshot(db: Session, version: int) -> dict:
+    """Arma el documento completo con 3 consultas (+ selectin) y lo comprime."""
+    modules = db.query(models.Module)\
+        .options(selectinload(models.Module.lessons))\
+        .order_by(models.Module.sort_order, models.Module.id)\
+        .all()
+    quizzes = db.query(models.Quiz)\
+        .options(selectinload(models.Quiz.questions))\
+        .order_by(models.Quiz.module_id, models.Quiz.id)\
+        .all()
+    signs = db.query(models.Sign).order_by(models.Sign.word, models.Sign.id).all()
+
+    document = schemas.CatalogSnapshot(
+        version=version,
+        modules=modules,
+        quizzes=quizzes,
+        signs=signs,
+    )
+    # option_urls solo se usa con expand=media, no va en el snapshot
+    raw = document.model_dump_json(
+        exclude={"quizzes": {"__all__": {"questions": {"__all__": {"option_urls"}}}}}
+    ).encode("utf-8")
+
+    return {
+        "version": version,
+        "identity": raw,
+        "gzip": gzip.compress(raw, compresslevel=9),
+        "br": brotli.compress(raw, quality=11) if brotli else None,
+    }
+
+
+def catalog_etag(version: int, encoding: str = "identity") -> str:
+    """
+    ETag de una version en una codificacion: los bytes de br, gzip y sin
+    comprimir son distintos, asi que cada uno lleva su propio ETag fuerte.
+    """
+    if encoding == "identity":
+        return f'"catalog-{version}"'
+    return f'"catalog-{version}-{encoding}"'
+
+
+def _parse_accept_encoding(accept_encoding: str) -> dict:
+    """
+    'gzip;q=0.5, br' -> {'gzip': 0.5, 'br': 1.0}. Un q que no es numero
+    cuenta como 0 (no aceptada).
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    return weights
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """
+    'br', 'gzip' o 'identity' segun el Accept-Encoding del cliente.
+    Respeta los q: una codificacion con q=0 no se usa aunque aparezca, y
+    '*' cubre las que no se nombran. Con el mismo q preferimos br.
+    """
+    weights = _parse_accept_encoding(accept_encoding)
+    default = weights.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        q = weights.get(encoding, default)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def get_catalog_etag(encoding: str = "identity") -> str:
+    """ETag del catalogo actual, sin tocar la BD (la version esta en cache)."""
+    return catalog_etag(catalog.get_version(), encoding)
+
+
+def get_catalog_snapshot(db: Session) -> dict:
+    """
+    Regresa el snapshot de la version actual: {version, etag, identity, gzip, br}.
+    Solo una peticion lo construye cuando cambia la version, las demas esperan.
+    """
+    global _snapshot
+    version = catalog.get_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot["version"] == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot["version"] != version:
+            _snapshot = _build_snapshot(db, version)
+        return _snapshot
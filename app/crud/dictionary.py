@@ -1,5 +1,279 @@
 from sqlalchemy.orm import Session
-from .. import models, schemas
+from sqlalchemy import or_, and_, func, select
+from bisect import bisect_left
+from collections import Counter
+import threading
+import unicodedata
+from .. import models, schemas, catalog
+from ..pagination import encode_cursor, decode_cursor
+
+
+def normalize_text(text: str) -> str:
+    """
+    Minusculas y sin acentos, para comparar sin importar como escriban
+    (ej. "Señas" -> "senas").
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).strip()
+
+
+# Los indices en memoria guardan la version del catalogo con la que se
+# armaron y se reconstruyen cuando cambia. Las consultas van sin lock: en el
+# camino async (run_sync) ceden el event loop y otra corrutina del mismo hilo
+# que esperara el lock lo trabaria. El lock solo protege el cambio de datos;
+# si dos peticiones reconstruyen a la vez las dos llegan al mismo resultado.
+
+class _PrefixIndex:
+    """
+    Arreglo ordenado de (palabra_normalizada, id, palabra) para autocompletar
+    con bisect. Se construye la primera vez que se usa y se vuelve a armar
+    cuando cambia la version del catalogo (asi todos los workers ven las
+    señas nuevas, no solo el que las creo).
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._version = None
+        self._lock = threading.Lock()
+
+    def ensure_built(self, db: Session):
+        version = catalog.get_version(db)
+        if self._version == version:
+            return
+        rows = db.query(models.Sign.id, models.Sign.word).all()
+        entries = sorted((normalize_text(word), sign_id, word) for sign_id, word in rows)
+        with self._lock:
+            self._entries = entries
+            self._version = version
+
+    def search(self, prefix: str, limit: int):
+        prefix = normalize_text(prefix)
+        entries = self._entries
+        results = []
+        i = bisect_left(entries, (prefix,))
+        while i < len(entries) and len(results) < limit:
+            normalized, sign_id, word = entries[i]
+            if not normalized.startswith(prefix):
+                break
+            results.append({"id": sign_id, "word": word})
+            i += 1
+        return results
+
+    def reset(self):
+        with self._lock:
+            self._entries = []
+            self._version = None
+
+
+_prefix_index = _PrefixIndex()
+
+
+# --- Busqueda difusa (tolerante a errores de dedo) ---
+
+NGRAM_SIZE = 2
+# Peso de cada campo en el ranking: la palabra vale mas que tags y categoria
+FIELD_WEIGHTS = {"word": 1.0, "tags": 0.7, "category": 0.5}
+MIN_SCORE = 0.35
+PREFIX_BONUS = 0.3
+
+
+def _ngrams(text: str):
+    padded = f" {text} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+class _NgramIndex:
+    """
+    Indice invertido n-grama -> entradas, sobre la palabra, los tags y
+    la categoria (normalizados) de cada seña. Se construye al arrancar y
+    se vuelve a armar cuando cambia la version del catalogo.
+    """
+
+    def __init__(self):
+        # (entradas, postings, categorias) se cambian juntas para que una
+        # busqueda nunca mezcle un indice viejo con uno nuevo:
+        #   entradas: [(sign_id, campo, texto_normalizado, num_ngramas)]
+        #   postings: ngrama -> [indice de entrada]
+        #   categorias: sign_id -> categoria (para filtrar)
+        self._state = ([], {}, {})
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _add_entry(entries: list, postings: dict, sign_id: int, field: str, text: str):
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+        grams = _ngrams(normalized)
+        entry_id = len(entries)
+        entries.append((sign_id, field, normalized, len(grams)))
+        for gram in grams:
+            postings.setdefault(gram, []).append(entry_id)
+
+    def ensure_built(self, db: Session):
+        version = catalog.get_version(db)
+        if self._version == version:
+            return
+        entries, postings, categories = [], {}, {}
+        rows = db.query(
+            models.Sign.id, models.Sign.word, models.Sign.category, models.Sign.tags
+        ).all()
+        for sign_id, word, category, tags in rows:
+            categories[sign_id] = category
+            self._add_entry(entries, postings, sign_id, "word", word)
+            if category:
+                self._add_entry(entries, postings, sign_id, "category", category)
+            for tag in tags or []:
+                if isinstance(tag, str):
+                    self._add_entry(entries, postings, sign_id, "tags", tag)
+        with self._lock:
+            self._state = (entries, postings, categories)
+            self._version = version
+
+    def search(self, query: str, category: str = None):
+        """Regresa [(sign_id, score)] ordenado de mayor a menor relevancia."""
+        normalized = normalize_text(query)
+        query_grams = _ngrams(normalized)
+        if not query_grams:
+            return []
+        entries, postings, categories = self._state
+
+        # 1. Cuantos n-gramas comparte cada entrada con la consulta
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(postings.get(gram, ()))
+
+        # 2. Score por seña = mejor campo (coeficiente de Dice * peso del campo)
+        scores = {}
+        for entry_id, count in shared.items():
+            sign_id, field, text, num_grams = entries[entry_id]
+            if category and categories.get(sign_id) != category:
+                continue
+            weight = FIELD_WEIGHTS[field]
+            score = weight * (2 * count) / (len(query_grams) + num_grams)
+            if text.startswith(normalized):
+                score += weight * PREFIX_BONUS
+            if score > scores.get(sign_id, 0):
+                scores[sign_id] = score
+
+        ranked = [(sign_id, score) for sign_id, score in scores.items() if score >= MIN_SCORE]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+
+    def reset(self):
+        with self._lock:
+            self._state = ([], {}, {})
+            self._version = None
+
+
+_ngram_index = _NgramIndex()
+
+
+# --- Facetas (conteo por categoria y tag) ---
+
+class _FacetTable:
+    """
+    Conteo de señas por categoria (y por tag) en memoria. Se construye
+    con un GROUP BY al arrancar y se vuelve a armar cuando cambia la
+    version del catalogo.
+    """
+
+    def __init__(self):
+        self._categories = Counter()
+        self._tags = Counter()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def ensure_built(self, db: Session):
+        version = catalog.get_version(db)
+        if self._version == version:
+            return
+        rows = db.query(models.Sign.category, func.count(models.Sign.id))\
+            .filter(models.Sign.category.isnot(None))\
+            .group_by(models.Sign.category)\
+            .all()
+        categories = Counter(dict(rows))
+
+        # tags es JSON, no se puede agrupar igual en todos los motores
+        tags_count = Counter()
+        for (tags,) in db.query(models.Sign.tags).filter(models.Sign.tags.isnot(None)):
+            tags_count.update(self._clean_tags(tags))
+        with self._lock:
+            self._categories, self._tags = categories, tags_count
+            self._version = version
+
+    @staticmethod
+    def _clean_tags(tags):
+        # Un tag repetido en la misma seña cuenta una sola vez
+        return {tag for tag in tags or [] if isinstance(tag, str)}
+
+    def snapshot(self, include_tags: bool = False) -> dict:
+        with self._lock:
+            facets = {"categories": dict(sorted(self._categories.items()))}
+            if include_tags:
+                facets["tags"] = dict(sorted(self._tags.items()))
+            return facets
+
+    def reset(self):
+        with self._lock:
+            self._categories = Counter()
+            self._tags = Counter()
+            self._version = None
+
+
+_facets = _FacetTable()
+
+
+def get_category_facets(db: Session, include_tags: bool = False) -> dict:
+    """Regresa {categories: {categoria: num_senas}} (y tags si se pide)."""
+    _facets.ensure_built(db)
+    return _facets.snapshot(include_tags=include_tags)
+
+
+def search_signs(
+    db: Session,
+    query: str,
+    skip: int = 0,
+    limit: int = 20,
+    category: str = None
+):
+    """
+    Busqueda difusa: tolera errores de dedo y acentos y tambien busca
+    en tags y categoria. Regresa las señas ordenadas por relevancia.
+    """
+    _ngram_index.ensure_built(db)
+    ranked = _ngram_index.search(query, category=category)[skip:skip + limit]
+    if not ranked:
+        return []
+
+    # Traemos las filas con un solo IN y las acomodamos segun el ranking
+    ids = [sign_id for sign_id, _ in ranked]
+    signs = db.query(models.Sign).filter(models.Sign.id.in_(ids)).all()
+    by_id = {sign.id: sign for sign in signs}
+    return [by_id[sign_id] for sign_id in ids if sign_id in by_id]
+
+
+def warm_up(db: Session):
+    """Construye los indices en memoria del diccionario (al arrancar la app)."""
+    _prefix_index.ensure_built(db)
+    _ngram_index.ensure_built(db)
+    _facets.ensure_built(db)
+
+
+def autocomplete(db: Session, prefix: str, limit: int = 10):
+    """Sugerencias por prefijo (sin acentos ni mayusculas) sin tocar la BD."""
+    _prefix_index.ensure_built(db)
+    return _prefix_index.search(prefix, limit)
+
+def _filter_signs(db: Session, query: str = None, category: str = None):
+    db_query = db.query(models.Sign)
+    if query:
+        search = f"{query}%"
+        db_query = db_query.filter(models.Sign.word.ilike(search))
+    if category:
+        db_query = db_query.filter(models.Sign.category == category)
+    # Orden estable (word, id), el mismo que usa la paginacion por cursor
+    return db_query.order_by(models.Sign.word, models.Sign.id)
 
 def get_signs(
     db: Session, 
@@ -8,17 +282,84 @@ def get_signs(
     query: str = None, 
     category: str = None
 ):
-    db_query = db.query(models.Sign)
+    return _filter_signs(db, query, category).offset(skip).limit(limit).all()
+
+# Columnas en el mismo orden que los campos de schemas.Sign
+_SIGN_COLUMNS = (
+    models.Sign.word,
+    models.Sign.category,
+    models.Sign.video_path,
+    models.Sign.thumb_path,
+    models.Sign.tags,
+    models.Sign.id,
+)
+
+def get_signs_fast(
+    db: Session,
+    skip: int = 0,
+    limit: int = 20,
+    query: str = None,
+    category: str = None
+):
+    """
+    Igual que get_signs pero solo selecciona columnas (filas Core) y
+    regresa dicts con la forma de schemas.Sign, listos para serializar
+    sin pasar por el mapa de identidad del ORM ni por Pydantic.
+    """
+    stmt = select(*_SIGN_COLUMNS)
     if query:
-        search = f"{query}%"
-        db_query = db_query.filter(models.Sign.word.ilike(search))
+        stmt = stmt.where(models.Sign.word.ilike(f"{query}%"))
     if category:
-        db_query = db_query.filter(models.Sign.category == category)
-    return db_query.offset(skip).limit(limit).all()
+        stmt = stmt.where(models.Sign.category == category)
+    stmt = stmt.order_by(models.Sign.word, models.Sign.id).offset(skip).limit(limit)
+
+    return [
+        {
+            "word": word,
+            "category": category,
+            "video_path": video_path,
+            "thumb_path": thumb_path,
+            "tags": tags,
+            "id": sign_id,
+            "video_url": None,
+            "thumb_url": None,
+        }
+        for word, category, video_path, thumb_path, tags, sign_id in db.execute(stmt)
+    ]
+
+def get_signs_page(
+    db: Session,
+    after: str = None,
+    limit: int = 20,
+    query: str = None,
+    category: str = None
+):
+    """
+    Paginacion por cursor sobre (word, id). 'after' es el next_cursor
+    de la pagina anterior (vacio o None = primera pagina).
+    """
+    db_query = _filter_signs(db, query, category)
+    if after:
+        word, sign_id = decode_cursor(after, str, int)
+        db_query = db_query.filter(or_(
+            models.Sign.word > word,
+            and_(models.Sign.word == word, models.Sign.id > sign_id)
+        ))
+
+    # Pedimos uno extra para saber si hay siguiente pagina
+    items = db_query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].word, items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
 
 def create_sign(db: Session, sign: schemas.SignCreate):
     db_sign = models.Sign(**sign.model_dump())
     db.add(db_sign)
+    catalog.bump_version(db)
     db.commit()
     db.refresh(db_sign)
-    return db_sign
\ No newline at end of file
+    # Los indices en memoria se vuelven a armar solos con la nueva version
+    return db_sign
+
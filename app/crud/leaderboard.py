@@ -0,0 +1,304 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, Date
+from bisect import bisect_left, insort
+from datetime import datetime, date, time as dt_time, timedelta
+import threading
+import time
+import os
+from .. import models, schemas
+from ..database import SessionLocal
+from .stats import calculate_xp
+
+# Tablas de posiciones por xp (global y por modulo; del dia, de la semana y
+# de siempre) en memoria. Se arman desde la BD al arrancar y se actualizan
+# con cada resultado guardado. Con varios workers cada uno solo ve sus
+# propias escrituras, asi que cada LEADERBOARD_REFRESH_SECONDS se vuelven
+# a armar desde la BD para que todos converjan (0 = nunca). Ese refresco
+# corre en un hilo aparte (uno a la vez); mientras, se sirven las tablas
+# actuales.
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "300"))
+
+PERIODS = ("daily", "weekly", "all")
+
+
+class _RankedBoard:
+    """
+    Usuarios ordenados por xp (lista ordenada de (-xp, user_id) + dict).
+    La posicion de un usuario se encuentra con bisect en O(log n);
+    empates comparten lugar (1, 1, 3...).
+    """
+
+    def __init__(self):
+        self._xp = {}
+        self._keys = []
+
+    def add(self, user_id: str, xp: int):
+        if not xp:
+            return
+        old = self._xp.get(user_id)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        new = (old or 0) + xp
+        self._xp[user_id] = new
+        insort(self._keys, (-new, user_id))
+
+    def rank_of_xp(self, xp: int) -> int:
+        # "" va antes que cualquier user_id: cuenta solo a los que tienen mas xp
+        return bisect_left(self._keys, (-xp, "")) + 1
+
+    def rank(self, user_id: str):
+        """(lugar, xp) del usuario, o None si no tiene xp en esta tabla."""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        return self.rank_of_xp(xp), xp
+
+    def top(self, limit: int):
+        """[(lugar, user_id, xp)] de los primeros 'limit'."""
+        entries = []
+        for position, (neg_xp, user_id) in enumerate(self._keys[:limit]):
+            if entries and entries[-1][2] == -neg_xp:
+                rank = entries[-1][0]
+            else:
+                rank = position + 1
+            entries.append((rank, user_id, -neg_xp))
+        return entries
+
+    def __len__(self):
+        return len(self._keys)
+
+
+_lock = threading.Lock()
+# (periodo, dia inicial del periodo o None, module_id o None) -> _RankedBoard
+_boards = {}
+# quiz_id -> module_id (para saber a que modulo suma cada intento)
+_quiz_modules = {}
+_built_at = None
+# Solo un rebuild a la vez (y a lo mas un refresco en segundo plano)
+_rebuild_lock = threading.Lock()
+_refreshing = False
+# Mientras corre un rebuild, lo que se suma a las tablas actuales tambien
+# se anota aqui para volver a sumarlo a las nuevas (si no se perderia).
+# Solo desde la primera consulta: lo anterior ya sale en las consultas
+_replay = None
+
+
+def _period_start(period: str, day: date):
+    if period == "daily":
+        return day
+    if period == "weekly":
+        return day - timedelta(days=day.weekday()) # semanas de lunes a domingo
+    return None
+
+
+def _add(boards: dict, user_id: str, module_id, xp: int, day: date, periods=PERIODS):
+    """Suma xp a las tablas global y del modulo de cada periodo vigente."""
+    today = datetime.now().date()
+    for period in periods:
+        start = _period_start(period, day)
+        # Resultados offline de otro dia/semana solo cuentan para "de siempre"
+        if start != _period_start(period, today):
+            continue
+        for scope in (None, module_id) if module_id is not None else (None,):
+            board = boards.get((period, start, scope))
+            if board is None:
+                board = boards[(period, start, scope)] = _RankedBoard()
+            board.add(user_id, xp)
+
+
+def _prune(boards: dict):
+    """Tira las tablas de dias o semanas que ya pasaron."""
+    today = datetime.now().date()
+    for key in [key for key in boards if key[1] != _period_start(key[0], today)]:
+        del boards[key]
+
+
+def rebuild():
+    """Arma todas las tablas desde la BD (al arrancar y cada LEADERBOARD_REFRESH_SECONDS)."""
+    with _rebuild_lock:
+        _rebuild_locked()
+
+
+def _begin_snapshot(db: Session):
+    """
+    Abre la transaccion del rebuild con una sola foto de la BD para todas
+    sus consultas; asi lo que entra a _replay es justo lo que no ven.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        # pysqlite no abre transaccion para los SELECT: la abrimos a mano
+        db.connection().exec_driver_sql("BEGIN")
+    else:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _rebuild_locked():
+    # Llamar con _rebuild_lock tomado. Usa su propia sesion para poder
+    # elegir el aislamiento de la transaccion.
+    global _replay
+    db = SessionLocal()
+    try:
+        _begin_snapshot(db)
+        _build(db)
+    finally:
+        with _lock:
+            _replay = None
+        db.close()
+
+
+def _build(db: Session):
+    global _boards, _built_at, _replay
+    today = datetime.now().date()
+    week_start = _period_start("weekly", today)
+    since = datetime.combine(week_start, dt_time.min)
+    boards = {}
+
+    quiz_modules = dict(db.execute(select(models.Quiz.id, models.Quiz.module_id)).all())
+    # La primera lectura fija la foto: lo que se sume desde aqui no sale en
+    # las consultas y hay que volver a sumarlo
+    with _lock:
+        _replay = []
+
+    # De siempre: xp por usuario y modulo
+    quiz_totals = db.query(models.QuizAttempt.user_id, models.Quiz.module_id, func.sum(models.QuizAttempt.score))\
+        .join(models.Quiz, models.Quiz.id == models.QuizAttempt.quiz_id)\
+        .group_by(models.QuizAttempt.user_id, models.Quiz.module_id)
+    for user_id, module_id, score in quiz_totals:
+        _add(boards, user_id, module_id, calculate_xp(int(score or 0), 0), today, periods=("all",))
+
+    memory_totals = db.query(models.MemoryRun.user_id, models.MemoryRun.module_id, func.sum(models.MemoryRun.matches))\
+        .group_by(models.MemoryRun.user_id, models.MemoryRun.module_id)
+    for user_id, module_id, matches in memory_totals:
+        _add(boards, user_id, module_id, calculate_xp(0, int(matches or 0)), today, periods=("all",))
+
+    # Del dia y de la semana: solo lo de esta semana, agrupado por dia
+    quiz_day = func.date(models.QuizAttempt.created_at, type_=Date)
+    quiz_week = db.query(models.QuizAttempt.user_id, models.Quiz.module_id, quiz_day, func.sum(models.QuizAttempt.score))\
+        .join(models.Quiz, models.Quiz.id == models.QuizAttempt.quiz_id)\
+        .filter(models.QuizAttempt.created_at >= since)\
+        .group_by(models.QuizAttempt.user_id, models.Quiz.module_id, quiz_day)
+    for user_id, module_id, day, score in quiz_week:
+        _add(boards, user_id, module_id, calculate_xp(int(score or 0), 0), day, periods=("daily", "weekly"))
+
+    memory_day = func.date(models.MemoryRun.created_at, type_=Date)
+    memory_week = db.query(models.MemoryRun.user_id, models.MemoryRun.module_id, memory_day, func.sum(models.MemoryRun.matches))\
+        .filter(models.MemoryRun.created_at >= since)\
+        .group_by(models.MemoryRun.user_id, models.MemoryRun.module_id, memory_day)
+    for user_id, module_id, day, matches in memory_week:
+        _add(boards, user_id, module_id, calculate_xp(0, int(matches or 0)), day, periods=("daily", "weekly"))
+
+    with _lock:
+        # Lo que se guardo mientras consultabamos
+        for args in _replay:
+            _add(boards, *args)
+        _boards = boards
+        _quiz_modules.clear()
+        _quiz_modules.update(quiz_modules)
+        _built_at = time.monotonic()
+
+
+def _quiz_module(db: Session, quiz_id: int):
+    if quiz_id not in _quiz_modules:
+        # Quiz creado despues de armar las tablas
+        _quiz_modules[quiz_id] = db.query(models.Quiz.module_id)\
+            .filter(models.Quiz.id == quiz_id)\
+            .scalar()
+    return _quiz_modules[quiz_id]
+
+
+def _record(user_id: str, module_id, xp: int, day: date):
+    # Llamar con _lock tomado
+    _add(_boards, user_id, module_id, xp, day)
+    if _replay is not None:
+        _replay.append((user_id, module_id, xp, day))
+
+
+def record_quiz_attempts(db: Session, user_id: str, rows):
+    """
+    Suma intentos de quiz ya guardados (dicts con quiz_id, score y created_at).
+    Llamar despues del commit.
+    """
+    modules = {row["quiz_id"]: _quiz_module(db, row["quiz_id"]) for row in rows}
+    with _lock:
+        for row in rows:
+            day = (row.get("created_at") or datetime.now()).date()
+            _record(user_id, modules[row["quiz_id"]], calculate_xp(row["score"], 0), day)
+
+
+def record_memory_runs(user_id: str, rows):
+    """
+    Suma partidas de memorama ya guardadas (dicts con module_id, matches y created_at).
+    Llamar despues del commit.
+    """
+    with _lock:
+        for row in rows:
+            day = (row.get("created_at") or datetime.now()).date()
+            _record(user_id, row.get("module_id"), calculate_xp(0, row.get("matches")), day)
+
+
+def _needs_refresh() -> bool:
+    return LEADERBOARD_REFRESH_SECONDS > 0 and time.monotonic() - _built_at > LEADERBOARD_REFRESH_SECONDS
+
+
+def _refresh():
+    global _refreshing
+    try:
+        rebuild()
+    except Exception as e:
+        # Seguimos con las tablas actuales; se reintenta en la siguiente consulta
+        print(f"Error refrescando tablas de posiciones: {e}")
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def _schedule_refresh():
+    """Arranca el refresco en segundo plano si no hay uno corriendo."""
+    global _refreshing
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_refresh, name="leaderboard-refresh", daemon=True).start()
+
+
+def get_leaderboard(db: Session, period: str, module_id: int = None, limit: int = 10, user_id: str = None) -> schemas.Leaderboard:
+    """
+    Los primeros 'limit' de la tabla y, si se pasa user_id, el lugar
+    de ese usuario (aunque no este en el top). No regresa los uid de
+    los demas, solo lugar, nombre y xp; 'is_me' marca al que pregunta.
+    """
+    if _built_at is None:
+        # Normalmente ya se armaron al arrancar; si no, la primera consulta
+        # espera (las demas esperan el mismo rebuild en lugar de repetirlo)
+        with _rebuild_lock:
+            if _built_at is None:
+                _rebuild_locked()
+    elif _needs_refresh():
+        _schedule_refresh()
+
+    start = _period_start(period, datetime.now().date())
+    with _lock:
+        _prune(_boards)
+        board = _boards.get((period, start, module_id)) or _RankedBoard()
+        top = board.top(limit)
+        me = board.rank(user_id) if user_id else None
+
+    # Nombres de los que vamos a mostrar (una sola consulta IN)
+    user_ids = {entry_user for _, entry_user, _ in top}
+    if me is not None:
+        user_ids.add(user_id)
+    names = {}
+    if user_ids:
+        names = dict(db.query(models.User.uid, models.User.name).filter(models.User.uid.in_(user_ids)).all())
+
+    return schemas.Leaderboard(
+        period=period,
+        module_id=module_id,
+        entries=[
+            schemas.LeaderboardEntry(
+                rank=rank, name=names.get(entry_user), xp=xp, is_me=user_id is not None and entry_user == user_id
+            )
+            for rank, entry_user, xp in top
+        ],
+        me=schemas.LeaderboardEntry(rank=me[0], name=names.get(user_id), xp=me[1], is_me=True) if me else None,
+    )
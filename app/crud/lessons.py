@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from .. import models, schemas
+from .. import models, schemas, catalog
 
 def get_lessons_by_module(db: Session, module_id: int):
     """Obtiene todas las lecciones de un dulo específico"""
@@ -12,6 +12,7 @@ def create_lesson(db: Session, lesson: schemas.LessonCreate, module_id: int):
         module_id=module_id
     )
     db.add(db_lesson)
+    catalog.bump_version(db)
     db.commit()
     db.refresh(db_lesson)
     return db_lesson
\ No newline at end of file
@@ -1,36 +1,233 @@
 from sqlalchemy.orm import Session
-from firebase_admin import storage
 from datetime import timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import os
 from .. import models
+from .. import storage
 
-def get_signed_video_url(db: Session, sign_id: int) -> str:
+# Duracion de las URLs firmadas y margen antes de que caduquen
+# (no regresamos una URL a la que le queden menos de REFRESH_MARGIN)
+SIGNED_URL_TTL = timedelta(minutes=10)
+REFRESH_MARGIN = timedelta(minutes=2)
+
+SIGNED_URL_CACHE_SIZE = int(os.getenv("SIGNED_URL_CACHE_SIZE", "2048"))
+SIGN_PATH_CACHE_SIZE = int(os.getenv("SIGN_PATH_CACHE_SIZE", "4096"))
+
+# Hilos para firmar varias URLs a la vez en las peticiones por lote
+SIGNING_WORKERS = int(os.getenv("SIGNING_WORKERS", "8"))
+_signing_pool = ThreadPoolExecutor(max_workers=SIGNING_WORKERS, thread_name_prefix="sign-url")
+
+
+class _LRUCache:
     """
-    Busca la ruta de un video en nuestra BD y genera una 
-    URL firmada y temporal (10 minutos) de Firebase Storage.
+    Cache LRU acotado y seguro entre hilos (los endpoints sync corren
+    en el threadpool). Lleva contadores de hits, misses y evictions.
     """
-    
-    # 1. Obtenemos la informacion de la sena (para saber su ruta)
-    sign = db.query(models.Sign).filter(models.Sign.id == sign_id).first()
-    
-    if not sign:
-        return None # La sena no existe
 
-    # Esta es la ruta que guardamos en nuestra db, ej: "videos/saludos/hola.mp4"
-    video_path = sign.video_path 
-    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# video_path -> (url, expira_en)
+_signed_urls = _LRUCache(SIGNED_URL_CACHE_SIZE)
+# sign_id -> video_path
+_sign_paths = _LRUCache(SIGN_PATH_CACHE_SIZE)
+
+
+def get_video_path(db: Session, sign_id: int):
+    """Regresa el video_path de una sena (cacheado, las rutas no cambian)."""
+    video_path = _sign_paths.get(sign_id)
+    if video_path is None:
+        video_path = db.query(models.Sign.video_path)\
+            .filter(models.Sign.id == sign_id)\
+            .scalar()
+        if video_path:
+            _sign_paths.set(sign_id, video_path)
+    return video_path
+
+
+def get_video_paths(db: Session, sign_ids) -> dict:
+    """
+    Regresa {sign_id: video_path} para varias senas con una sola
+    consulta IN (solo para las que no estan en cache).
+    Las senas que no existen no aparecen en el resultado.
+    """
+    paths = {}
+    missing = []
+    for sign_id in set(sign_ids):
+        video_path = _sign_paths.get(sign_id)
+        if video_path is None:
+            missing.append(sign_id)
+        else:
+            paths[sign_id] = video_path
+
+    if missing:
+        rows = db.query(models.Sign.id, models.Sign.video_path)\
+            .filter(models.Sign.id.in_(missing))\
+            .all()
+        for sign_id, video_path in rows:
+            if video_path:
+                _sign_paths.set(sign_id, video_path)
+                paths[sign_id] = video_path
+    return paths
+
+
+def sign_video_path(video_path: str) -> str:
+    """
+    Firma la URL de un video, reusando una firmada antes si todavia
+    le queda mas de REFRESH_MARGIN de vida.
+    """
+    now = time.time()
+    cached = _signed_urls.get(video_path)
+    if cached is not None:
+        url, expires_at = cached
+        if expires_at - now > REFRESH_MARGIN.total_seconds():
+            return url
+        _signed_urls.discard(video_path)
+
     try:
-        # 2. Obtenemos el "bucket" (el almacen) de Firebase Storage
-        # revisar que 'firebase-service-account.json' tenga permisos
-        bucket = storage.bucket() # Usa el bucket por defecto configurado
-        
-        # 3. Le pedimos al bucket que nos firme la URL para ese archivo
-        blob = bucket.blob(video_path)
-        
-        # 4. Generamos la URL con una caducidad de 10 minutos
-        signed_url = blob.generate_signed_url(expiration=timedelta(minutes=10))
-        
-        return signed_url
-        
+        # Le pedimos al backend (Firebase Storage o carpeta local)
+        # que nos firme la URL con una caducidad de 10 minutos
+        signed_url = storage.get_backend().sign_url(video_path, SIGNED_URL_TTL)
+
     except Exception as e:
         print(f"Error generando URL firmada: {e}")
-        return None
\ No newline at end of file
+        return None
+
+    _signed_urls.set(video_path, (signed_url, now + SIGNED_URL_TTL.total_seconds()))
+    return signed_url
+
+
+def get_signed_video_url(db: Session, sign_id: int) -> str:
+    """
+    Busca la ruta de un video en nuestra BD y genera una
+    URL firmada y temporal (10 minutos) del backend de storage.
+    """
+
+    # Esta es la ruta que guardamos en nuestra db, ej: "videos/saludos/hola.mp4"
+    video_path = get_video_path(db, sign_id)
+
+    if not video_path:
+        return None # La sena no existe
+
+    return sign_video_path(video_path)
+
+
+def sign_video_paths(video_paths) -> dict:
+    """
+    Firma varias rutas en paralelo. Regresa {video_path: url o None}.
+    """
+    unique_paths = list(set(video_paths))
+    if len(unique_paths) <= 1:
+        return {path: sign_video_path(path) for path in unique_paths}
+    urls = _signing_pool.map(sign_video_path, unique_paths)
+    return dict(zip(unique_paths, urls))
+
+
+def _is_media_path(value) -> bool:
+    return isinstance(value, str) and "/" in value
+
+
+def expand_signs(signs):
+    """
+    Llena video_url y thumb_url de una lista de schemas.Sign
+    firmando todas las rutas en un solo lote.
+    """
+    paths = []
+    for sign in signs:
+        paths.append(sign.video_path)
+        if sign.thumb_path:
+            paths.append(sign.thumb_path)
+    urls = sign_video_paths(paths)
+
+    for sign in signs:
+        sign.video_url = urls.get(sign.video_path)
+        if sign.thumb_path:
+            sign.thumb_url = urls.get(sign.thumb_path)
+    return signs
+
+
+def expand_quiz(quiz):
+    """
+    Llena option_urls de cada pregunta de un schemas.QuizPublic
+    (las opciones guardan la ruta del video de cada respuesta).
+    """
+    paths = [
+        value
+        for question in quiz.questions
+        for value in (question.options or {}).values()
+        if _is_media_path(value)
+    ]
+    urls = sign_video_paths(paths)
+
+    for question in quiz.questions:
+        question.option_urls = {
+            key: urls.get(value)
+            for key, value in (question.options or {}).items()
+            if _is_media_path(value)
+        }
+    return quiz
+
+
+def get_cache_stats() -> dict:
+    """Contadores de los caches de media (para monitoreo)."""
+    return {
+        "signed_urls": _signed_urls.stats(),
+        "sign_paths": _sign_paths.stats(),
+    }
+
+
+def set_storage_backend(backend: storage.StorageBackend):
+    """Cambia el backend de storage y tira las URLs firmadas con el anterior."""
+    storage.set_backend(backend)
+    _signed_urls.clear()
+
+
+def clear_caches():
+    _signed_urls.clear()
+    _sign_paths.clear()
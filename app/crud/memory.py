@@ -1,7 +1,52 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.sql.expression import func # Para aleatorio (RANDOM)
-from .. import models, schemas
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas, catalog, writebehind
+from . import stats as crud_stats
+from . import leaderboard as crud_leaderboard
 from datetime import datetime
+import random
+import threading
+
+# --- Pool de pares para los mazos ---
+# (version_catalogo, [pair_id, ...], {categoria: [pair_id, ...]})
+# Se arma con una consulta y se reconstruye si cambia la version del
+# catalogo (create_sign_pair y create_sign la suben); sortear un mazo
+# es un random.sample en memoria en lugar de ORDER BY RANDOM en la BD.
+_pair_pool = None
+_pair_pool_lock = threading.Lock()
+
+
+def _get_pair_pool(db: Session):
+    global _pair_pool
+    version = catalog.get_version(db)
+    pool = _pair_pool
+    if pool is not None and pool[0] == version:
+        return pool
+
+    all_ids = []
+    by_category = {}
+    rows = db.execute(
+        select(models.SignPair.id, models.Sign.category)
+        .join(models.Sign, models.Sign.id == models.SignPair.sign_id)
+        .order_by(models.SignPair.id)
+    ).all()
+    for pair_id, category in rows:
+        all_ids.append(pair_id)
+        if category:
+            by_category.setdefault(category, []).append(pair_id)
+
+    pool = (version, all_ids, by_category)
+    with _pair_pool_lock:
+        _pair_pool = pool
+    return pool
+
+
+def invalidate_pair_pool():
+    """Tira el pool para que el siguiente mazo lo vuelva a armar."""
+    global _pair_pool
+    with _pair_pool_lock:
+        _pair_pool = None
 
 def create_sign_pair(db: Session, sign_id: int, word: str):
     """Crea un par de palabra-seña para el juego."""
@@ -12,27 +57,72 @@ def create_sign_pair(db: Session, sign_id: int, word: str):
         
     db_pair = models.SignPair(word=word, sign_id=sign_id)
     db.add(db_pair)
+    catalog.bump_version(db)
     db.commit()
     db.refresh(db_pair)
+    # en este proceso lo tiramos ya; los demas workers lo notan por la version
+    invalidate_pair_pool()
     return db_pair
 
-def get_memory_deck(db: Session, size: int = 8):
+def get_memory_deck(db: Session, size: int = 8, category: str = None):
     """
     Obtiene un mazo aleatorio de pares para el juego.
     'size' es el numero de PARES (ej. 8 pares = 16 cartas).
+    Con 'category' solo salen pares de senas de esa categoria.
     """
-    # .order_by(func.random()) es aleatorio (funciona en SQLite/PostgreSQL)
-    # .limit(size) toma el numero de pares que pedimos
-    return db.query(models.SignPair).order_by(func.random()).limit(size).all()
+    # 1. Sorteamos los ids del pool en memoria (O(size), sin ordenar la tabla)
+    _, all_ids, by_category = _get_pair_pool(db)
+    candidates = by_category.get(category, []) if category else all_ids
+    pair_ids = random.sample(candidates, min(size, len(candidates)))
+    if not pair_ids:
+        return []
+
+    # 2. Traemos esos pares con su sena en una sola consulta IN
+    pairs = db.query(models.SignPair)\
+        .options(joinedload(models.SignPair.sign))\
+        .filter(models.SignPair.id.in_(pair_ids))\
+        .all()
+    by_id = {pair.id: pair for pair in pairs}
+    return [by_id[pair_id] for pair_id in pair_ids if pair_id in by_id]
 
-def create_memory_run(db: Session, run: schemas.MemoryRunCreate, user_id: str):
+def create_memory_run(db: Session, run: schemas.MemoryRunCreate, user_id: str, block: bool = True):
     """Guarda el resultado de una partida de memorama."""
     db_run = models.MemoryRun(
         **run.model_dump(), # Pasa todos los campos (matches, attempts, etc.)
         user_id=user_id,
         created_at=datetime.now()
     )
+
+    # Con write-behind solo la encolamos (se guarda en el siguiente lote, sin id todavia)
+    buffer = writebehind.get_buffer()
+    if buffer is not None:
+        buffer.submit(writebehind.MEMORY_RUN, {
+            **run.model_dump(),
+            "user_id": user_id,
+            "created_at": db_run.created_at,
+        }, block=block)
+        return db_run
+
+    crud_stats.ensure_user_stats(db, [user_id])
     db.add(db_run)
+    crud_stats.record_memory_runs(db, user_id, [{
+        "matches": run.matches, "duration_ms": run.duration_ms, "created_at": db_run.created_at,
+    }])
     db.commit()
     db.refresh(db_run)
-    return db_run
\ No newline at end of file
+    crud_leaderboard.record_memory_runs(user_id, [{
+        "module_id": db_run.module_id, "matches": db_run.matches, "created_at": db_run.created_at,
+    }])
+    return db_run
+
+
+
+# --- Versiones async (ASYNC_DB=1), misma logica via run_sync ---
+
+async def get_memory_deck_async(db: AsyncSession, size: int = 8, category: str = None):
+    return await db.run_sync(get_memory_deck, size=size, category=category)
+
+
+async def create_memory_run_async(db: AsyncSession, run: schemas.MemoryRunCreate, user_id: str):
+    # block=False: con la cola de write-behind llena no esperamos dentro del loop
+    return await db.run_sync(create_memory_run, run=run, user_id=user_id, block=False)
@@ -1,25 +1,93 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from sqlalchemy.sql.expression import func
-from .. import models, schemas
+from datetime import datetime
+import hashlib
+import random
+import threading
+import os
+from .. import models, catalog
+
+# --- Quizzes por modulo ---
+# (version_catalogo, {module_id: [quiz_id, ...]}) se arma con una sola
+# consulta y se reconstruye si cambia la version del catalogo.
+_module_quiz_ids = None
+_module_quiz_ids_lock = threading.Lock()
+
+# --- Misiones del dia ---
+# (uid, fecha, limit) -> [quiz_id, ...]. Se sortean una vez por usuario y dia;
+# las demas llamadas del dia salen de aqui sin tocar la BD.
+DAILY_MISSIONS_CACHE_SIZE = int(os.getenv("DAILY_MISSIONS_CACHE_SIZE", "50000"))
+_daily_missions = {}
+_daily_missions_day = None
+_daily_missions_lock = threading.Lock()
+
+
+def get_module_quiz_ids(db: Session) -> dict:
+    """Regresa {module_id: [quiz_id ordenados]} (cacheado por version del catalogo)."""
+    global _module_quiz_ids
+    version = catalog.get_version()
+    cached = _module_quiz_ids
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    by_module = {}
+    rows = db.execute(
+        select(models.Quiz.module_id, models.Quiz.id).order_by(models.Quiz.module_id, models.Quiz.id)
+    ).all()
+    for module_id, quiz_id in rows:
+        by_module.setdefault(module_id, []).append(quiz_id)
+
+    with _module_quiz_ids_lock:
+        _module_quiz_ids = (version, by_module)
+    return by_module
+
+
+def _mission_seed(user_id: str, day) -> int:
+    # sha256 y no hash(): hash() cambia en cada proceso y cada worker
+    # le daria misiones distintas al mismo usuario
+    digest = hashlib.sha256(f"{user_id}:{day.isoformat()}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
 
 def get_daily_missions(db: Session, user_id: str, limit: int = 3):
     """
     Genera 3 misiones diarias basadas en el nivel del usuario
-     usa Quizzes aleatorios de modulos desbloqueados
+     usa Quizzes de modulos desbloqueados, sorteados con una semilla
+     (uid, fecha): el mismo usuario ve las mismas misiones todo el dia.
+    Regresa solo los ids; el contenido se sirve del cache de quizzes.
     """
-    
-    # 1. Encontrar el nivel del usuario 
+    global _daily_missions_day
+    today = datetime.now().date()
+    key = (user_id, today, limit)
+    missions = _daily_missions.get(key)
+    if missions is not None:
+        return missions
+
+    # 1. Encontrar el nivel del usuario
     max_module = db.query(func.max(models.UserModuleProgress.module_id))\
         .filter(models.UserModuleProgress.user_id == user_id)\
         .scalar()
-    
+
     max_unlocked_id = max_module if max_module else 1
-    
-    # 2. Seleccionar retos
-    daily_quizzes = db.query(models.Quiz)\
-        .filter(models.Quiz.module_id <= max_unlocked_id)\
-        .order_by(func.random())\
-        .limit(limit)\
-        .all()
-        
-    return daily_quizzes
\ No newline at end of file
+
+    # 2. Seleccionar retos (sorteo en memoria, sin ORDER BY RANDOM en la BD)
+    by_module = get_module_quiz_ids(db)
+    pool = [
+        quiz_id
+        for module_id in sorted(by_module)
+        if module_id <= max_unlocked_id
+        for quiz_id in by_module[module_id]
+    ]
+    rng = random.Random(_mission_seed(user_id, today))
+    missions = rng.sample(pool, min(limit, len(pool)))
+
+    with _daily_missions_lock:
+        # Las misiones de dias anteriores ya no sirven
+        if _daily_missions_day != today:
+            _daily_missions.clear()
+            _daily_missions_day = today
+        if len(_daily_missions) >= DAILY_MISSIONS_CACHE_SIZE:
+            _daily_missions.pop(next(iter(_daily_missions)))
+        _daily_missions[key] = missions
+    return missions
@@ -1,20 +1,112 @@
-from sqlalchemy.orm import Session
-from .. import models, schemas # Importamos modelos y esquemas
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select
+import threading
+from .. import models, schemas, catalog # Importamos modelos y esquemas
+from ..pagination import encode_cursor, decode_cursor
+
+# (version_catalogo, frozenset de ids de modulos) para validar module_id
+# sin consultar la BD; se reconstruye si cambia la version del catalogo.
+_module_ids = None
+_module_ids_lock = threading.Lock()
 
 # --- CRUD para modulos ---
 
+def get_module_ids(db: Session) -> frozenset:
+    """Ids de todos los modulos (cacheado por version del catalogo)."""
+    global _module_ids
+    version = catalog.get_version(db)
+    cached = _module_ids
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    module_ids = frozenset(db.scalars(select(models.Module.id)))
+    with _module_ids_lock:
+        _module_ids = (version, module_ids)
+    return module_ids
+
 def get_module(db: Session, module_id: int):
     """Obtiene un modulo especifico por su ID"""
     # .filter() es el "WHERE" de SQL
     # .first() obtiene el primer resultado o None
-    return db.query(models.Module).filter(models.Module.id == module_id).first()
+    return db.query(models.Module)\
+        .options(selectinload(models.Module.lessons))\
+        .filter(models.Module.id == module_id).first()
 
 def get_modules(db: Session, skip: int = 0, limit: int = 100):
     """Obtiene una lista de modulos, con paginacion"""
     # .offset() es el "saltar" (skip)
     # .limit() es el "limite"
     # .all() obtiene todos los resultados
-    return db.query(models.Module).offset(skip).limit(limit).all()
+    # selectinload trae las lecciones de todos los modulos en una sola consulta
+    # (sin esto Pydantic las carga una por una al serializar: 1+N consultas)
+    return db.query(models.Module)\
+        .options(selectinload(models.Module.lessons))\
+        .order_by(models.Module.id).offset(skip).limit(limit).all()
+
+def get_modules_fast(db: Session, skip: int = 0, limit: int = 100):
+    """
+    Igual que get_modules pero con filas Core (2 consultas) y dicts con la
+    forma de schemas.Module, listos para serializar sin Pydantic.
+    """
+    module_rows = db.execute(
+        select(
+            models.Module.title,
+            models.Module.description,
+            models.Module.code,
+            models.Module.sort_order,
+            models.Module.id,
+            models.Module.created_at,
+        ).order_by(models.Module.id).offset(skip).limit(limit)
+    ).all()
+
+    modules = []
+    by_id = {}
+    for title, description, code, sort_order, module_id, created_at in module_rows:
+        module = {
+            "title": title,
+            "description": description,
+            "code": code,
+            "sort_order": sort_order,
+            "id": module_id,
+            "created_at": created_at,
+            "lessons": [],
+        }
+        modules.append(module)
+        by_id[module_id] = module
+
+    if by_id:
+        lesson_rows = db.execute(
+            select(
+                models.Lesson.title,
+                models.Lesson.sort_order,
+                models.Lesson.id,
+                models.Lesson.module_id,
+            ).where(models.Lesson.module_id.in_(list(by_id))).order_by(models.Lesson.id)
+        )
+        for title, sort_order, lesson_id, module_id in lesson_rows:
+            by_id[module_id]["lessons"].append({
+                "title": title,
+                "sort_order": sort_order,
+                "id": lesson_id,
+                "module_id": module_id,
+            })
+    return modules
+
+def get_modules_page(db: Session, after: str = None, limit: int = 100):
+    """Paginacion por cursor sobre el id del modulo"""
+    db_query = db.query(models.Module)\
+        .options(selectinload(models.Module.lessons))\
+        .order_by(models.Module.id)
+    if after:
+        (module_id,) = decode_cursor(after, int)
+        db_query = db_query.filter(models.Module.id > module_id)
+
+    items = db_query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
 
 def create_module(db: Session, module: schemas.ModuleCreate):
     """Crea un nuevo modulo en la base de datos"""
@@ -22,6 +114,7 @@ def create_module(db: Session, module: schemas.ModuleCreate):
     db_module = models.Module(**module.model_dump())
     # 2. anade el objeto a la sesion
     db.add(db_module)
+    catalog.bump_version(db)
     # 3. Confirma (guarda) los cambios en la BD
     db.commit()
     # 4. Refresca el objeto para obtener el ID generado por la BD
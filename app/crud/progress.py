@@ -1,134 +1,170 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date
+from sqlalchemy import update
 from .. import models, schemas
 from datetime import datetime, timedelta
+from . import stats as crud_stats
+from ..upsert import upsert, insert_ignore, greatest
 
-def upsert_user_progress(db: Session, user_id: str, progress_in: schemas.UserModuleProgressCreate):
+def upsert_progress_batch(db: Session, user_id: str, items) -> list:
     """
-    Crea o actualiza (UPSERT) el progreso de un usuario en un módulo.
-    La BBDD se encarga de actualizar 'last_activity' automáticamente.
+    Crea o actualiza (UPSERT nativo, una sola sentencia) el progreso de
+    un usuario en uno o varios modulos.
+
+    El percent nunca baja: se guarda GREATEST(anterior, nuevo), asi un
+    cliente atrasado no pisa un avance mayor aunque lleguen al mismo tiempo.
+    Regresa las filas resultantes en el orden de los module_id recibidos.
     """
-    
-    # Preparamos el objeto con los datos
-    db_progress = models.UserModuleProgress(
-        user_id=user_id,
-        module_id=progress_in.module_id,
-        percent=progress_in.percent,
-        last_activity=datetime.now() # Aseguramos que se actualice al insertar/actualizar
+    # Si un modulo viene repetido nos quedamos con el percent mayor
+    percents = {}
+    for item in items:
+        percents[item.module_id] = max(item.percent, percents.get(item.module_id, 0))
+
+    now = datetime.now()
+    rows = [
+        {"user_id": user_id, "module_id": module_id, "percent": percent, "last_activity": now}
+        for module_id, percent in percents.items()
+    ]
+
+    # Modulos que llegan al 100%: contamos cuantos pasan a dominados con
+    # sentencias atomicas (dos peticiones al mismo tiempo no cuentan doble)
+    newly_mastered = 0
+    mastered = [row for row in rows if row["percent"] == 100]
+    if mastered:
+        # (antes de tocar el progreso: los totales se calculan desde ahi)
+        crud_stats.ensure_user_stats(db, [user_id])
+        # los que no existian (se insertan ya al 100%)...
+        newly_mastered += insert_ignore(db, models.UserModuleProgress, mastered)
+        # ...y los que existian por debajo del 100%
+        newly_mastered += db.execute(
+            update(models.UserModuleProgress)
+            .where(models.UserModuleProgress.user_id == user_id)
+            .where(models.UserModuleProgress.module_id.in_([row["module_id"] for row in mastered]))
+            .where(models.UserModuleProgress.percent < 100)
+            .values(percent=100, last_activity=now)
+        ).rowcount
+
+    upsert(
+        db,
+        models.UserModuleProgress,
+        rows,
+        lambda table, new: {
+            "percent": greatest(db, table.c.percent, new("percent")),
+            "last_activity": new("last_activity"),
+        },
     )
-    
-    # merge() se encarga del UPSERT:
-    # Si la Primary Key (user_id, module_id) existe, la actualiza.
-    # Si no existe, la inserta.
-    merged_progress = db.merge(db_progress)
+    crud_stats.add_to_user_stats(db, user_id, mastered_modules=newly_mastered)
     db.commit()
-    
-    return merged_progress
+
+    # Leemos el resultado (el percent final puede ser el que ya estaba)
+    saved = db.query(models.UserModuleProgress)\
+        .filter(models.UserModuleProgress.user_id == user_id)\
+        .filter(models.UserModuleProgress.module_id.in_(percents))\
+        .all()
+    by_module = {row.module_id: row for row in saved}
+    return [by_module[module_id] for module_id in percents if module_id in by_module]
+
+
+def upsert_user_progress(db: Session, user_id: str, progress_in: schemas.UserModuleProgressCreate):
+    """Crea o actualiza (UPSERT) el progreso de un usuario en un modulo."""
+    saved = upsert_progress_batch(db, user_id, [progress_in])
+    return saved[0] if saved else None
 
 
 def get_user_progress(db: Session, user_id: str):
     """Obtiene todo el progreso (por modulo) del usuario actual."""
     return db.query(models.UserModuleProgress).filter(models.UserModuleProgress.user_id == user_id).all()
 
+# Dias que leemos por consulta al contar la racha (casi siempre basta una)
+STREAK_PAGE_DAYS = 120
+ACTIVITY_HISTORY_MAX_DAYS = 365
+
 def calculate_streak(db: Session, user_id: str) -> int:
     'calcula la racha de actividad del user'
 
-
-    # 1. Obtener fechas de actividad de Quizzes
-    quiz_dates = db.query(cast(models.QuizAttempt.created_at, Date))\
-        .filter(models.QuizAttempt.user_id == user_id)\
-        .all()
-        
-    # 2. Obtener fechas de actividad de Memorama
-    memory_dates = db.query(cast(models.MemoryRun.created_at, Date))\
-        .filter(models.MemoryRun.user_id == user_id)\
-        .all()
-        
-    # 3. Unir y limpiar fechas (Set para eliminar duplicados del mismo día)
-    # La estructura [0] es porque SQLAlchemy devuelve tuplas (fecha,)
-    all_dates = set([q[0] for q in quiz_dates] + [m[0] for m in memory_dates])
-    
-    if not all_dates:
-        return 0
-        
-    # 4. Ordenar de la mas reciente a la mmas antigua
-    sorted_dates = sorted(list(all_dates), reverse=True)
-    
     today = datetime.now().date()
     yesterday = today - timedelta(days=1)
-    
-    # 5. ver si la racha esta viva 
-    latest_date = sorted_dates[0]
-    if latest_date != today and latest_date != yesterday:
-        return 0 # Racha rota :(
-        
-    # 6. Contar dias consecutivos anteriores
-    streak = 1
-    current_check = latest_date
-    
-    for i in range(1, len(sorted_dates)):
-        expected_prev_date = current_check - timedelta(days=1)
-        if sorted_dates[i] == expected_prev_date:
+
+    # Recorremos los dias con actividad del mas reciente hacia atras
+    # (rango sobre la PK de user_daily_activity) hasta el primer hueco
+    streak = 0
+    expected_day = None
+    until = today
+    while True:
+        days = db.query(models.UserDailyActivity.day)\
+            .filter(models.UserDailyActivity.user_id == user_id)\
+            .filter(models.UserDailyActivity.day <= until)\
+            .order_by(models.UserDailyActivity.day.desc())\
+            .limit(STREAK_PAGE_DAYS)\
+            .all()
+
+        for (day,) in days:
+            if expected_day is None:
+                # ver si la racha esta viva
+                if day != today and day != yesterday:
+                    return 0 # Racha rota :(
+            elif day != expected_day:
+                return streak # Se rompio la racha
             streak += 1
-            current_check = sorted_dates[i]
-        else:
-            break # Se rompio la r1a ha
-            
-    return streak
+            expected_day = day - timedelta(days=1)
+
+        if len(days) < STREAK_PAGE_DAYS:
+            return streak
+        until = expected_day
+
+def get_activity_history(db: Session, user_id: str, days: int) -> list:
+    """
+    Actividad de los ultimos 'days' dias (incluyendo hoy), del mas antiguo
+    al mas reciente. Los dias sin actividad salen en ceros.
+    """
+    today = datetime.now().date()
+    since = today - timedelta(days=days - 1)
+    rows = {row.day: row for row in crud_stats.get_daily_activity(db, user_id, since, today)}
+
+    history = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        row = rows.get(day)
+        quiz_score = row.quiz_score if row else 0
+        memory_matches = row.memory_matches if row else 0
+        history.append(schemas.DailyActivity(
+            day=day,
+            quiz_score=quiz_score,
+            memory_matches=memory_matches,
+            duration_ms=row.duration_ms if row else 0,
+            activity_count=row.activity_count if row else 0,
+            xp=crud_stats.calculate_xp(quiz_score, memory_matches),
+        ))
+    return history
 
 def get_user_stats_summary(db: Session, user_id: str) -> schemas.StatsSummary:
     """
     Calcula las estadisticas resumidas para el dashboard del usuario.
     """
     
-    # 1. Calcular precision global y tiempo total de quizzes
-    quiz_stats = db.query(
-        func.sum(models.QuizAttempt.score).label("total_score"),
-        func.sum(models.QuizAttempt.total).label("total_questions"),
-        func.sum(models.QuizAttempt.duration_ms).label("total_quiz_time")
-    ).filter(models.QuizAttempt.user_id == user_id).first()
-
-    # 2. Calcular tiempo total de memorama
-    memory_time = db.query(
-        func.sum(models.MemoryRun.duration_ms).label("total_memory_time")
-    ).filter(models.MemoryRun.user_id == user_id).scalar() or 0
-
-    # 3. Calcular precision
-    total_score = quiz_stats.total_score or 0
-    total_questions = quiz_stats.total_questions
-    
+    # 1. Totales del usuario (una lectura por llave primaria de user_stats)
+    stats = crud_stats.get_user_stats(db, user_id) or models.UserStats(
+        user_id=user_id, **dict.fromkeys(crud_stats.STAT_COLUMNS, 0)
+    )
+
+    # 2. Calcular precision
     precision_global = 0.0
-    if total_questions and total_questions > 0:
-        precision_global = (total_score / total_questions) * 100
-    
-    # 4. Calcular tiempo total
-    total_duration_ms = (quiz_stats.total_quiz_time or 0) + memory_time
+    if stats.total_questions > 0:
+        precision_global = (stats.total_score / stats.total_questions) * 100
 
-    # 5. Calcular senas dominadas (ej: modulos completados al 100%)
-    senas_dominadas = db.query(models.UserModuleProgress).filter(
-        models.UserModuleProgress.user_id == user_id,
-        models.UserModuleProgress.percent == 100
-    ).count()
+    # 3. Calcular tiempo total
+    total_duration_ms = stats.quiz_time_ms + stats.memory_time_ms
 
-    # 6. exp de ho
-    today = datetime.now().date()
+    # 4. Senas dominadas (modulos completados al 100%)
+    senas_dominadas = stats.mastered_modules
 
-    #score de quizz de hoy
-    daily_quiz_score = db.query(func.sum(models.QuizAttempt.score))\
-        .filter(models.QuizAttempt.user_id == user_id)\
-        .filter(cast(models.QuizAttempt.created_at, Date) == today)\
-        .scalar() or 0
-    
-    #score de memorama de hoy
-    daily_memory_matches = db.query(func.sum(models.MemoryRun.matches))\
-        .filter(models.MemoryRun.user_id == user_id)\
-        .filter(cast(models.MemoryRun.created_at, Date) == today)\
-        .scalar() or 0
-    
-    # xp total de hoy = aciertos de quiz (10) + puntos por memorama(5)
-    xp_today = (daily_quiz_score * 10) + (daily_memory_matches * 5)
+    # 5. exp de hoy (fila de hoy en el resumen diario)
+    today = datetime.now().date()
+    today_activity = db.get(models.UserDailyActivity, (user_id, today))
+    xp_today = 0
+    if today_activity is not None:
+        xp_today = crud_stats.calculate_xp(today_activity.quiz_score, today_activity.memory_matches)
 
-    # 7. calc racha
+    # 6. calc racha
     racha_real = calculate_streak(db, user_id)
 
 
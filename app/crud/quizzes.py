@@ -1,39 +1,151 @@
-from sqlalchemy.orm import Session
-from .. import models, schemas
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas, catalog, writebehind
+from . import stats as crud_stats
+from . import leaderboard as crud_leaderboard
+from ..pagination import encode_cursor, decode_cursor
 from datetime import datetime
+import threading
+
+# --- Cache de claves de respuestas ---
+# quiz_id -> (version_catalogo, {"question_id": respuesta_normalizada})
+# Se arma una vez por quiz y se reconstruye si cambia la version del catalogo,
+# asi calificar no vuelve a leer quiz_questions.
+_answer_keys = {}
+_answer_keys_lock = threading.Lock()
+
+
+def _normalize_answer(answer) -> str:
+    if not isinstance(answer, str):
+        return None
+    return answer.strip().lower()
+
+
+def get_answer_key(db: Session, quiz_id: int):
+    """
+    Regresa {"question_id": respuesta_normalizada} del quiz,
+    o None si el quiz no existe.
+    """
+    version = catalog.get_version(db)
+    cached = _answer_keys.get(quiz_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # Una sola consulta: el quiz con sus preguntas (LEFT JOIN por si no tiene)
+    rows = db.execute(
+        select(models.Quiz.id, models.QuizQuestion.id, models.QuizQuestion.answer)
+        .outerjoin(models.QuizQuestion, models.QuizQuestion.quiz_id == models.Quiz.id)
+        .where(models.Quiz.id == quiz_id)
+    ).all()
+    if not rows:
+        return None
+
+    answer_key = {
+        str(question_id): _normalize_answer(answer)
+        for _, question_id, answer in rows
+        if question_id is not None
+    }
+    with _answer_keys_lock:
+        _answer_keys[quiz_id] = (version, answer_key)
+    return answer_key
+
+
+def invalidate_answer_key(quiz_id: int = None):
+    """Tira la clave de un quiz (o todas) para que se vuelva a armar."""
+    with _answer_keys_lock:
+        if quiz_id is None:
+            _answer_keys.clear()
+        else:
+            _answer_keys.pop(quiz_id, None)
+
+
+def grade_answers(answer_key: dict, user_answers) -> int:
+    """
+    Califica en una sola pasada contra la clave.
+    'user_answers' es un dict: { "question_id": "respuesta_usuario" }
+    """
+    if not isinstance(user_answers, dict):
+        return 0
+    score = 0
+    for question_id, correct in answer_key.items():
+        user_answer = user_answers.get(question_id)
+        if correct is not None and _normalize_answer(user_answer) == correct:
+            score += 1
+    return score
 
 def get_quiz_by_module(db: Session, module_id: int):
     """Obtiene todos los quizzes de un modulo"""
-    return db.query(models.Quiz).filter(models.Quiz.module_id == module_id).all()
+    return db.query(models.Quiz)\
+        .options(selectinload(models.Quiz.questions))\
+        .filter(models.Quiz.module_id == module_id).all()
+
+# --- Quizzes para la app (sin respuestas), ya serializados ---
+# quiz_id -> (version_catalogo, bytes JSON de schemas.QuizPublic)
+_quiz_payloads = {}
+_quiz_payloads_lock = threading.Lock()
+
+
+def get_quiz_payloads(db: Session, quiz_ids) -> dict:
+    """
+    Regresa {quiz_id: bytes JSON} sin respuestas para varios quizzes.
+    Se renderizan una vez por version del catalogo; los que falten se
+    cargan con una sola consulta. Los que no existen no aparecen.
+    """
+    version = catalog.get_version(db)
+    payloads = {}
+    missing = []
+    for quiz_id in set(quiz_ids):
+        cached = _quiz_payloads.get(quiz_id)
+        if cached is not None and cached[0] == version:
+            payloads[quiz_id] = cached[1]
+        else:
+            missing.append(quiz_id)
+
+    if missing:
+        quizzes = db.query(models.Quiz)\
+            .options(selectinload(models.Quiz.questions))\
+            .filter(models.Quiz.id.in_(missing))\
+            .all()
+        with _quiz_payloads_lock:
+            for quiz in quizzes:
+                body = schemas.QuizPublic.model_validate(quiz).model_dump_json().encode("utf-8")
+                _quiz_payloads[quiz.id] = (version, body)
+                payloads[quiz.id] = body
+    return payloads
+
+
+def get_quiz_payload(db: Session, quiz_id: int):
+    """Bytes JSON de un quiz sin respuestas, o None si no existe."""
+    return get_quiz_payloads(db, [quiz_id]).get(quiz_id)
+
+
+def get_quiz_ids_by_module(db: Session, module_id: int):
+    """Solo los ids de los quizzes de un modulo (para armar la respuesta cacheada)"""
+    return db.execute(
+        select(models.Quiz.id).where(models.Quiz.module_id == module_id).order_by(models.Quiz.id)
+    ).scalars().all()
+
 
 def get_quiz(db: Session, quiz_id: int):
     """Obtiene un quiz especifico por su ID"""
-    return db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+    return db.query(models.Quiz)\
+        .options(selectinload(models.Quiz.questions))\
+        .filter(models.Quiz.id == quiz_id).first()
 
-def create_quiz_attempt(db: Session, attempt: schemas.QuizAttemptCreate, user_id: str):
+def create_quiz_attempt(db: Session, attempt: schemas.QuizAttemptCreate, user_id: str, block: bool = True):
     """
     Registra un intento de quiz
     Calcula la calificación comparando las respuestas del usuario con las correctas
     """
-    # 1. Obtenemos el quiz original con sus preguntas
-    quiz = get_quiz(db, quiz_id=attempt.quiz_id)
-    if not quiz:
+    # 1. Obtenemos la clave de respuestas del quiz (cacheada)
+    answer_key = get_answer_key(db, quiz_id=attempt.quiz_id)
+    if answer_key is None:
         return None
 
     # 2. Calculamos la calificacion
-    score = 0
-    total_questions = len(quiz.questions)
-    
-    # Convertimos las respuestas del usuario a un diccionario para facil acceso
-    # Suponemos que 'attempt.answers' es un dict: { "question_id": "respuesta_usuario" }
-    user_answers = attempt.answers 
-    
-    for question in quiz.questions:
-        # Buscamos si el usuario respondio esta pregunta
-        user_answer = user_answers.get(str(question.id))
-        
-        if user_answer and user_answer.lower() == question.answer.lower():
-             score += 1
+    score = grade_answers(answer_key, attempt.answers)
+    total_questions = len(answer_key)
 
     # 3. Creamos el registro del intento
     db_attempt = models.QuizAttempt(
@@ -44,11 +156,34 @@ def create_quiz_attempt(db: Session, attempt: schemas.QuizAttemptCreate, user_id
         duration_ms=attempt.duration_ms,
         created_at=datetime.now()
     )
+
+    # Con write-behind solo lo encolamos (se guarda en el siguiente lote, sin id todavia)
+    buffer = writebehind.get_buffer()
+    if buffer is not None:
+        buffer.submit(writebehind.QUIZ_ATTEMPT, {
+            "user_id": user_id,
+            "quiz_id": attempt.quiz_id,
+            "score": score,
+            "total": total_questions,
+            "duration_ms": attempt.duration_ms,
+            "created_at": db_attempt.created_at,
+        }, block=block)
+        return db_attempt
     
-    # 4. Guardamos en la BD
+    # 4. Guardamos en la BD (y sumamos a los totales del usuario en la misma transaccion)
+    crud_stats.ensure_user_stats(db, [user_id])
     db.add(db_attempt)
+    crud_stats.record_quiz_attempts(db, user_id, [{
+        "score": score, "total": total_questions,
+        "duration_ms": attempt.duration_ms, "created_at": db_attempt.created_at,
+    }])
     db.commit()
     db.refresh(db_attempt)
+
+    # 5. Sumamos a las tablas de posiciones (ya con el intento guardado)
+    crud_leaderboard.record_quiz_attempts(db, user_id, [{
+        "quiz_id": db_attempt.quiz_id, "score": score, "created_at": db_attempt.created_at,
+    }])
     
     return db_attempt
 
@@ -56,9 +191,31 @@ def get_user_attempts(db: Session, user_id: str, skip: int = 0, limit: int = 50)
     """Obtiene el historial de intentos de un usuario."""
     return db.query(models.QuizAttempt)\
              .filter(models.QuizAttempt.user_id == user_id)\
-             .order_by(models.QuizAttempt.created_at.desc())\
+             .order_by(models.QuizAttempt.created_at.desc(), models.QuizAttempt.id.desc())\
              .offset(skip).limit(limit).all()
 
+def get_user_attempts_page(db: Session, user_id: str, after: str = None, limit: int = 50):
+    """
+    Historial por cursor sobre (created_at, id), del mas reciente al mas viejo.
+    Usa el indice (user_id, created_at, id) sin escanear las filas anteriores.
+    """
+    db_query = db.query(models.QuizAttempt)\
+        .filter(models.QuizAttempt.user_id == user_id)\
+        .order_by(models.QuizAttempt.created_at.desc(), models.QuizAttempt.id.desc())
+    if after:
+        created_at, attempt_id = decode_cursor(after, datetime, int)
+        db_query = db_query.filter(or_(
+            models.QuizAttempt.created_at < created_at,
+            and_(models.QuizAttempt.created_at == created_at, models.QuizAttempt.id < attempt_id)
+        ))
+
+    items = db_query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return {"items": items, "next_cursor": next_cursor}
+
 def create_quiz_with_questions(db: Session, quiz: schemas.QuizCreateFull, module_id: int):
     """Crea un quiz y sus preguntas en una sola transacción."""
     
@@ -82,6 +239,20 @@ def create_quiz_with_questions(db: Session, quiz: schemas.QuizCreateFull, module
         )
         db.add(db_question)
     
+    catalog.bump_version(db)
     db.commit()
     db.refresh(db_quiz)
-    return db_quiz
\ No newline at end of file
+    invalidate_answer_key(db_quiz.id)
+    return db_quiz
+
+
+
+# --- Versiones async (ASYNC_DB=1), misma logica via run_sync ---
+
+async def get_quiz_payload_async(db: AsyncSession, quiz_id: int):
+    return await db.run_sync(get_quiz_payload, quiz_id=quiz_id)
+
+
+async def create_quiz_attempt_async(db: AsyncSession, attempt: schemas.QuizAttemptCreate, user_id: str):
+    # block=False: con la cola de write-behind llena no esperamos dentro del loop
+    return await db.run_sync(create_quiz_attempt, attempt=attempt, user_id=user_id, block=False)
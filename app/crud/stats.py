@@ -0,0 +1,235 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, Date
+from collections import defaultdict
+from datetime import datetime
+import os
+from .. import models
+from ..upsert import upsert, upsert_increment, insert_ignore
+
+# Totales por usuario en la tabla user_stats. Cada escritura (intento, partida,
+# progreso) suma su parte en la misma transaccion, antes del commit, asi que
+# los totales nunca quedan desfasados de las tablas de origen.
+# Lo mismo para el resumen diario (user_daily_activity): una fila por dia
+# con actividad, que es lo que leen la racha, el xp del dia y el historial.
+#
+# Las sumas solo cuadran si las filas ya tenian el historial anterior: antes
+# de la primera escritura de un usuario, ensure_user_stats se las calcula.
+
+REBUILD_CHUNK_SIZE = 500
+
+# xp = aciertos de quiz (10) + puntos por memorama (5)
+QUIZ_XP_PER_POINT = 10
+MEMORY_XP_PER_MATCH = 5
+
+# user_ids que ya sabemos que tienen fila en user_stats (por proceso)
+USERS_WITH_STATS_MAX_SIZE = int(os.getenv("USERS_WITH_STATS_CACHE_SIZE", "50000"))
+_users_with_stats = {}  # user_id -> None (dict para conservar el orden de insercion)
+
+STAT_COLUMNS = ("total_score", "total_questions", "quiz_time_ms", "memory_time_ms", "mastered_modules")
+DAILY_COLUMNS = ("quiz_score", "memory_matches", "duration_ms", "activity_count")
+
+
+def calculate_xp(quiz_score: int, memory_matches: int) -> int:
+    return (quiz_score or 0) * QUIZ_XP_PER_POINT + (memory_matches or 0) * MEMORY_XP_PER_MATCH
+
+
+def add_to_user_stats(db: Session, user_id: str, **increments):
+    """Suma los incrementos (ej. total_score=3) a los totales del usuario. No hace commit."""
+    increments = {column: value for column, value in increments.items() if value}
+    if not increments:
+        return
+    upsert_increment(db, models.UserStats, {"user_id": user_id}, increments)
+
+
+def add_daily_activity(db: Session, user_id: str, rows, points_column: str, points_key: str):
+    """
+    Suma actividades (dicts con created_at, duration_ms y 'points_key') al
+    resumen diario del usuario: un solo UPSERT con una fila por dia. No hace commit.
+    """
+    per_day = defaultdict(lambda: dict.fromkeys(DAILY_COLUMNS, 0))
+    for row in rows:
+        day = (row.get("created_at") or datetime.now()).date()
+        totals = per_day[day]
+        totals[points_column] += row.get(points_key) or 0
+        totals["duration_ms"] += row.get("duration_ms") or 0
+        totals["activity_count"] += 1
+    if not per_day:
+        return
+
+    upsert(
+        db,
+        models.UserDailyActivity,
+        [{"user_id": user_id, "day": day, **totals} for day, totals in per_day.items()],
+        lambda table, new: {column: table.c[column] + new(column) for column in DAILY_COLUMNS},
+    )
+
+
+def record_quiz_attempts(db: Session, user_id: str, rows):
+    """Suma uno o varios intentos de quiz (dicts con score, total, duration_ms y created_at)."""
+    add_to_user_stats(
+        db,
+        user_id,
+        total_score=sum(row["score"] for row in rows),
+        total_questions=sum(row["total"] for row in rows),
+        quiz_time_ms=sum(row.get("duration_ms") or 0 for row in rows),
+    )
+    add_daily_activity(db, user_id, rows, "quiz_score", "score")
+
+
+def record_memory_runs(db: Session, user_id: str, rows):
+    """Suma una o varias partidas de memorama (dicts con matches, duration_ms y created_at)."""
+    add_to_user_stats(db, user_id, memory_time_ms=sum(row.get("duration_ms") or 0 for row in rows))
+    add_daily_activity(db, user_id, rows, "memory_matches", "matches")
+
+
+def _remember_user_stats(user_id: str):
+    if len(_users_with_stats) >= USERS_WITH_STATS_MAX_SIZE:
+        _users_with_stats.pop(next(iter(_users_with_stats)))
+    _users_with_stats[user_id] = None
+
+
+def ensure_user_stats(db: Session, user_ids):
+    """
+    Si alguno de los usuarios no tiene fila en user_stats se la calcula desde
+    su historial, junto con sus dias en user_daily_activity (la racha y el
+    historial salen de ahi); si no, la primera suma crearia las filas solo
+    con ese incremento. Llamar antes de insertar las filas nuevas, en la misma
+    transaccion. No hace commit.
+    Los usuarios que ya sabemos que tienen fila no hacen ninguna consulta.
+    """
+    missing = {user_id for user_id in user_ids if user_id not in _users_with_stats}
+    if not missing:
+        return
+
+    existing = {
+        user_id for (user_id,) in db.query(models.UserStats.user_id)
+            .filter(models.UserStats.user_id.in_(missing))
+    }
+    for user_id in existing:
+        _remember_user_stats(user_id)
+    missing -= existing
+    if missing:
+        # INSERT que no hace nada si otra peticion la creo al mismo tiempo
+        # (esa ya trae el historial y su suma)
+        insert_ignore(db, models.UserStats, _aggregate_user_stats(db, list(missing)))
+        days = _aggregate_daily_activity(db, list(missing))
+        for start in range(0, len(days), REBUILD_CHUNK_SIZE):
+            insert_ignore(db, models.UserDailyActivity, days[start:start + REBUILD_CHUNK_SIZE])
+
+
+def get_user_stats(db: Session, user_id: str):
+    """Lee los totales por llave primaria (None si el usuario no tiene actividad)."""
+    return db.get(models.UserStats, user_id)
+
+
+def _aggregate_user_stats(db: Session, user_ids=None) -> list:
+    """Totales de cada usuario calculados desde las tablas de origen."""
+    totals = {}
+
+    def _collect(query, model, columns):
+        if user_ids is not None:
+            query = query.filter(model.user_id.in_(user_ids))
+        for user_id, *values in query.group_by(model.user_id):
+            row = totals.setdefault(user_id, dict.fromkeys(STAT_COLUMNS, 0))
+            for column, value in zip(columns, values):
+                row[column] = int(value or 0)
+
+    _collect(
+        db.query(
+            models.QuizAttempt.user_id,
+            func.sum(models.QuizAttempt.score),
+            func.sum(models.QuizAttempt.total),
+            func.sum(models.QuizAttempt.duration_ms),
+        ),
+        models.QuizAttempt,
+        ("total_score", "total_questions", "quiz_time_ms"),
+    )
+    _collect(
+        db.query(models.MemoryRun.user_id, func.sum(models.MemoryRun.duration_ms)),
+        models.MemoryRun,
+        ("memory_time_ms",),
+    )
+    _collect(
+        db.query(models.UserModuleProgress.user_id, func.count())
+            .filter(models.UserModuleProgress.percent == 100),
+        models.UserModuleProgress,
+        ("mastered_modules",),
+    )
+
+    # Los usuarios pedidos sin actividad quedan en ceros
+    for user_id in user_ids or ():
+        totals.setdefault(user_id, dict.fromkeys(STAT_COLUMNS, 0))
+
+    return [{"user_id": user_id, **values} for user_id, values in totals.items()]
+
+
+def rebuild_user_stats(db: Session, user_ids=None) -> int:
+    """
+    Recalcula los totales desde las tablas de origen (backfill o reparacion).
+    Sin user_ids recalcula a todos los usuarios. No hace commit.
+    Regresa cuantas filas se escribieron.
+    """
+    rows = _aggregate_user_stats(db, user_ids)
+    # Reemplaza los totales (no suma) si la fila ya existia; por partes
+    # para no pasarnos del limite de parametros por sentencia
+    for start in range(0, len(rows), REBUILD_CHUNK_SIZE):
+        upsert(
+            db,
+            models.UserStats,
+            rows[start:start + REBUILD_CHUNK_SIZE],
+            lambda table, new: {column: new(column) for column in STAT_COLUMNS},
+        )
+    return len(rows)
+
+
+def _aggregate_daily_activity(db: Session, user_ids=None) -> list:
+    """Filas (usuario, dia) del resumen diario calculadas desde quiz_attempts y memory_runs."""
+    totals = defaultdict(lambda: dict.fromkeys(DAILY_COLUMNS, 0))
+
+    def _collect(model, points_column, points):
+        # DATE() en lugar de CAST(... AS DATE): en SQLite el CAST regresa un numero
+        day = func.date(model.created_at, type_=Date)
+        query = db.query(
+            model.user_id, day, func.sum(points), func.sum(model.duration_ms), func.count()
+        )
+        if user_ids is not None:
+            query = query.filter(model.user_id.in_(user_ids))
+        for user_id, row_day, points_sum, duration, count in query.group_by(model.user_id, day):
+            row = totals[(user_id, row_day)]
+            row[points_column] += int(points_sum or 0)
+            row["duration_ms"] += int(duration or 0)
+            row["activity_count"] += count
+
+    _collect(models.QuizAttempt, "quiz_score", models.QuizAttempt.score)
+    _collect(models.MemoryRun, "memory_matches", models.MemoryRun.matches)
+
+    return [{"user_id": user_id, "day": day, **values} for (user_id, day), values in totals.items()]
+
+
+def rebuild_daily_activity(db: Session, user_ids=None) -> int:
+    """
+    Recalcula el resumen diario desde quiz_attempts y memory_runs (backfill
+    o reparacion). Sin user_ids recalcula a todos. No hace commit.
+    Regresa cuantas filas (usuario, dia) se escribieron.
+    """
+    rows = _aggregate_daily_activity(db, user_ids)
+
+    # Reemplazamos: borramos lo anterior de esos usuarios y reinsertamos
+    delete = db.query(models.UserDailyActivity)
+    if user_ids is not None:
+        delete = delete.filter(models.UserDailyActivity.user_id.in_(user_ids))
+    delete.delete(synchronize_session=False)
+
+    if rows:
+        db.execute(insert(models.UserDailyActivity), rows)
+    return len(rows)
+
+
+def get_daily_activity(db: Session, user_id: str, since, until=None) -> list:
+    """Dias con actividad del usuario entre 'since' y 'until' (inclusive), del mas reciente al mas antiguo."""
+    query = db.query(models.UserDailyActivity)\
+        .filter(models.UserDailyActivity.user_id == user_id)\
+        .filter(models.UserDailyActivity.day >= since)
+    if until is not None:
+        query = query.filter(models.UserDailyActivity.day <= until)
+    return query.order_by(models.UserDailyActivity.day.desc()).all()
@@ -0,0 +1,142 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import os
+from .. import models, schemas
+from . import quizzes as crud_quizzes
+from . import modules as crud_modules
+from . import stats as crud_stats
+from . import leaderboard as crud_leaderboard
+
+# Tolerancia para relojes de cliente adelantados: un created_at hasta estos
+# segundos en el futuro se guarda como "ahora"; mas alla se rechaza el item
+SYNC_CLOCK_SKEW_SECONDS = int(os.getenv("SYNC_CLOCK_SKEW_SECONDS", "300"))
+
+
+def _previously_synced(db: Session, user_id: str, client_ids) -> dict:
+    """client_id -> SyncedResult de los que ya se habian sincronizado (un IN)."""
+    rows = db.query(models.SyncedResult)\
+        .filter(models.SyncedResult.user_id == user_id)\
+        .filter(models.SyncedResult.client_id.in_(client_ids))\
+        .all()
+    return {row.client_id: row for row in rows}
+
+
+def _client_timestamp(created_at, now: datetime):
+    """
+    Hora del cliente como hora local sin zona (como las que guarda el
+    servidor), o None si viene del futuro. Sin created_at usamos 'now'.
+    """
+    if created_at is None:
+        return now
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone().replace(tzinfo=None)
+    if created_at > now:
+        if created_at - now > timedelta(seconds=SYNC_CLOCK_SKEW_SECONDS):
+            return None
+        return now
+    return created_at
+
+
+def sync_results(db: Session, user_id: str, items, _retry: bool = True) -> list:
+    """
+    Guarda un lote mixto de intentos de quiz y partidas de memorama
+    en una sola transaccion. Regresa un resultado por item, en orden.
+
+    - Los quizzes se califican con la clave de respuestas cacheada.
+    - Los client_id ya sincronizados (o repetidos en el lote) se marcan
+      como 'duplicate' y no se vuelven a insertar.
+    - Un quiz o modulo que no existe, o un created_at en el futuro, marca
+      solo ese item como 'error'; el resto del lote se guarda.
+    """
+    now = datetime.now()
+    already_synced = _previously_synced(db, user_id, {item.client_id for item in items})
+    module_ids = None
+
+    results = []
+    quiz_rows = []
+    memory_rows = []
+    synced_rows = []
+    seen = set()
+
+    for item in items:
+        result = schemas.SyncItemResult(client_id=item.client_id, kind=item.kind, status="created")
+        results.append(result)
+
+        # 1. Reenvios (o repetidos dentro del mismo lote): no se vuelven a guardar
+        if item.client_id in already_synced or item.client_id in seen:
+            result.status = "duplicate"
+            continue
+        seen.add(item.client_id)
+
+        created_at = _client_timestamp(item.created_at, now)
+        if created_at is None:
+            result.status = "error"
+            result.detail = "created_at en el futuro"
+            continue
+
+        # 2. Armamos la fila (calificando los quizzes en memoria)
+        if item.kind == "quiz_attempt":
+            answer_key = crud_quizzes.get_answer_key(db, quiz_id=item.quiz_id)
+            if answer_key is None:
+                result.status = "error"
+                result.detail = "Quiz no encontrado"
+                continue
+            result.score = crud_quizzes.grade_answers(answer_key, item.answers)
+            result.total = len(answer_key)
+            quiz_rows.append({
+                "user_id": user_id,
+                "quiz_id": item.quiz_id,
+                "score": result.score,
+                "total": result.total,
+                "duration_ms": item.duration_ms,
+                "created_at": created_at,
+            })
+        else:
+            # Mismo criterio que quiz_id: un module_id que no existe es error
+            # del item y no un IntegrityError que tumbe todo el lote
+            if item.module_id is not None:
+                if module_ids is None:
+                    module_ids = crud_modules.get_module_ids(db)
+                if item.module_id not in module_ids:
+                    result.status = "error"
+                    result.detail = "Modulo no encontrado"
+                    continue
+            memory_rows.append({
+                **item.model_dump(exclude={"kind", "client_id", "created_at"}),
+                "user_id": user_id,
+                "created_at": created_at,
+            })
+        synced_rows.append({"user_id": user_id, "client_id": item.client_id, "kind": item.kind})
+
+    if not synced_rows:
+        return results
+
+    # 3. Un INSERT masivo por tabla (executemany), los totales del usuario
+    #    y un solo commit
+    try:
+        crud_stats.ensure_user_stats(db, [user_id])
+        if quiz_rows:
+            db.execute(insert(models.QuizAttempt), quiz_rows)
+            crud_stats.record_quiz_attempts(db, user_id, quiz_rows)
+        if memory_rows:
+            db.execute(insert(models.MemoryRun), memory_rows)
+            crud_stats.record_memory_runs(db, user_id, memory_rows)
+        db.execute(insert(models.SyncedResult), synced_rows)
+        db.commit()
+    except IntegrityError:
+        # Otro request sincronizo el mismo client_id al mismo tiempo:
+        # deshacemos todo y repetimos una vez (ahora saldran como 'duplicate')
+        db.rollback()
+        if not _retry:
+            raise
+        return sync_results(db, user_id, items, _retry=False)
+
+    # 4. Ya guardado: lo sumamos a las tablas de posiciones
+    if quiz_rows:
+        crud_leaderboard.record_quiz_attempts(db, user_id, quiz_rows)
+    if memory_rows:
+        crud_leaderboard.record_memory_runs(user_id, memory_rows)
+
+    return results
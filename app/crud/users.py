@@ -0,0 +1,60 @@
+from sqlalchemy.orm import Session
+import os
+from .. import models
+from ..upsert import insert_ignore
+
+# UIDs que ya sabemos que existen en la tabla 'users' (por proceso).
+# Con esto las peticiones normales no tocan la tabla users para nada.
+KNOWN_UIDS_MAX_SIZE = int(os.getenv("KNOWN_UIDS_CACHE_SIZE", "50000"))
+_known_uids = {}  # uid -> None (dict para conservar el orden de insercion)
+
+
+def is_known_uid(uid: str) -> bool:
+    return uid in _known_uids
+
+
+def ensure_user(db: Session, uid: str, email: str = None, name: str = None):
+    """
+    Crea la fila del usuario la primera vez que vemos su UID.
+    Si ya esta en el set de UIDs conocidos no hace ninguna consulta.
+    """
+    if uid in _known_uids:
+        return False
+
+    # email es obligatorio y unico en la tabla, si el token no trae
+    # (ej. login anonimo o por telefono) usamos uno derivado del uid
+    placeholder = f"{uid}@sin-correo.local"
+    if not _insert_user(db, uid, email or placeholder, name):
+        # Si no se inserto puede ser que ya existia... o que el email ya es
+        # de otra cuenta (mismo correo con otro uid); en ese caso va el derivado
+        exists = _uid_exists(db, uid)
+        if not exists and email:
+            exists = _insert_user(db, uid, placeholder, name) or _uid_exists(db, uid)
+        if not exists:
+            print(f"ADVERTENCIA: no se pudo crear el usuario {uid}")
+            return False
+
+    if len(_known_uids) >= KNOWN_UIDS_MAX_SIZE:
+        _known_uids.pop(next(iter(_known_uids)))
+    _known_uids[uid] = None
+    return True
+
+
+def _insert_user(db: Session, uid: str, email: str, name: str = None) -> bool:
+    """INSERT que no hace nada si choca con un uid o email existente. Regresa si se inserto."""
+    inserted = insert_ignore(db, models.User, [{
+        "uid": uid,
+        "email": email[:255],
+        "name": name[:120] if name else None,
+    }])
+    db.commit()
+    return inserted > 0
+
+
+def _uid_exists(db: Session, uid: str) -> bool:
+    return db.query(models.User.uid).filter(models.User.uid == uid).first() is not None
+
+
+def forget_known_uids():
+    """Vacia el set de UIDs conocidos (ej. despues de limpiar la BD)."""
+    _known_uids.clear()
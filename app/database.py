@@ -41,6 +41,37 @@ else:
 #sesion oara comunicarse con db
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor async opcional (ASYNC_DB=1): aiosqlite para SQLite y asyncmy para MySQL.
+# Con el, los endpoints mas usados corren como 'async def' en el event loop
+# en lugar de ocupar un hilo del threadpool por peticion.
+ASYNC_DB = os.getenv("ASYNC_DB", "0") == "1"
+async_engine = None
+AsyncSessionLocal = None
+
+
+def _async_url(url: str) -> str:
+    """Cambia el driver de la URL por su version async."""
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    if url.startswith("mysql"):
+        return "mysql+asyncmy://" + url.split("://", 1)[1]
+    return url
+
+
+if ASYNC_DB:
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        if "sqlite" in DATABASE_URL:
+            async_engine = create_async_engine(_async_url(DATABASE_URL))
+        else:
+            async_engine = create_async_engine(_async_url(DATABASE_URL), pool_recycle=3600)
+        # expire_on_commit=False: despues del commit no se pueden hacer
+        # lazy loads fuera del event loop, asi que no expiramos los objetos
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    except ImportError as e:
+        print(f"ADVERTENCIA: ASYNC_DB=1 pero no esta instalado el driver async ({e}); se usa el motor sync.")
+
 # clase de todos nuestro modelos de datos
 
 Base = declarative_base()
@@ -1,12 +1,22 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 from firebase_admin import auth, credentials
 import firebase_admin
+import jwt
 
 import os
 import json
+import time
+import hashlib
+from typing import Optional
 
-from .database import SessionLocal # Importamos nuestra SessionLocal
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import SessionLocal, AsyncSessionLocal # Importamos nuestra SessionLocal
+from .crud import users as crud_users
+from . import catalog
 # --- Dependencia para la Sesión de BD ---
 
 def get_db():
@@ -20,6 +30,15 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """
+    Como get_db pero con AsyncSession (solo existe con ASYNC_DB=1
+    y el driver async instalado).
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # 1. Buscamos si existe la variable de entorno con el JSON completo (produccion/Nube)
 try:
     firebase_creds_json = os.getenv("FIREBASE_CREDENTIALS_JSON")
@@ -55,26 +74,106 @@ except Exception as e:
 
 # Esto le dice a FastAPI "busca un token en la cabecera 'Authorization'"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Igual pero sin error si no viene el token (endpoints publicos con extras para usuarios)
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-# --- Guardian ---
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        # 1. Le pedimos a Firebase que verifique el token
-        decoded_token = auth.verify_id_token(token)
+# --- Cache de tokens verificados ---
+# Un cliente movil reusa el mismo ID token (1 hora) en muchas llamadas,
+# asi que guardamos los claims ya verificados por digest del token
+# y los tiramos cuando llega su 'exp'.
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+_token_cache = {}  # digest -> (exp, claims)
 
-        # 2. Si es valido, extraemos el ID de usuario (uid)
-        uid = decoded_token.get("uid")
-        if not uid:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token no vsalifo, no se encontro UID",
-            )
-        
+# Llaves locales (kid -> PEM publico) para verificar tokens sin Firebase,
+# ej. en pruebas o en un entorno sin red.
+_local_keys = None
+_local_keys_path = os.getenv("FIREBASE_LOCAL_KEYS")
+if _local_keys_path:
+    with open(_local_keys_path, "r", encoding="utf-8") as f:
+        _local_keys = json.load(f)
+
+
+def set_local_keys(keys):
+    """
+    Usa un juego de llaves locales (dict kid -> PEM publico) en lugar de
+    los certificados de Firebase. Con None se regresa a Firebase.
+    """
+    global _local_keys
+    _local_keys = keys
+    _token_cache.clear()
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _get_cached_claims(digest: str):
+    entry = _token_cache.get(digest)
+    if entry is None:
+        return None
+    exp, claims = entry
+    if time.time() >= exp:
+        # Ya expiro, lo sacamos del cache
+        _token_cache.pop(digest, None)
+        return None
+    return claims
+
+
+def _cache_claims(digest: str, claims: dict):
+    exp = claims.get("exp")
+    if not exp:
+        return
+    if len(_token_cache) >= TOKEN_CACHE_MAX_SIZE:
+        # Primero limpiamos los expirados, si sigue lleno sacamos el mas viejo
+        now = time.time()
+        for key in [k for k, (e, _) in _token_cache.items() if e <= now]:
+            del _token_cache[key]
+        if len(_token_cache) >= TOKEN_CACHE_MAX_SIZE:
+            _token_cache.pop(next(iter(_token_cache)))
+    _token_cache[digest] = (exp, claims)
 
-        # 3. Devolvemos el UID para que el endpoint lo use
-        return {"uid": uid}
 
-    except auth.InvalidIdTokenError:
+def _verify_with_local_keys(token: str) -> dict:
+    """Verifica un token RS256 contra las llaves locales."""
+    header = jwt.get_unverified_header(token)
+    key = _local_keys.get(header.get("kid"))
+    if not key:
+        raise jwt.InvalidTokenError("kid desconocido")
+    claims = jwt.decode(
+        token,
+        key=key,
+        algorithms=["RS256"],
+        options={"verify_aud": False},
+    )
+    # Igual que firebase_admin, exponemos el 'sub' como 'uid'
+    claims["uid"] = claims.get("sub")
+    return claims
+
+
+def _verify_token(token: str) -> dict:
+    """
+    Verificacion sincrona (RSA + descarga de certificados publicos).
+    Se corre en el threadpool para no bloquear el event loop.
+    """
+    if _local_keys is not None:
+        return _verify_with_local_keys(token)
+    return auth.verify_id_token(token)
+
+
+# --- Guardian ---
+async def _verify_uid(token: str) -> dict:
+    """
+    Verifica el token (con cache) y regresa sus claims, sin tocar la BD.
+    Lanza 401 si es invalido y 500 si no se pudo verificar.
+    """
+    try:
+        # 1. Buscamos el token en el cache, si no esta le pedimos a Firebase que lo verifique
+        digest = _token_digest(token)
+        decoded_token = _get_cached_claims(digest)
+        if decoded_token is None:
+            decoded_token = await run_in_threadpool(_verify_token, token)
+            _cache_claims(digest, decoded_token)
+    except (auth.InvalidIdTokenError, jwt.InvalidTokenError):
         # El token es invalido o expiro
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,4 +184,158 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error de auth: {e}",
-        )
\ No newline at end of file
+        )
+
+    # 2. Si es valido, extraemos el ID de usuario (uid)
+    if not decoded_token.get("uid"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token no vsalifo, no se encontro UID",
+        )
+    return decoded_token
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    decoded_token = await _verify_uid(token)
+    uid = decoded_token["uid"]
+
+    # 3. La primera vez que vemos el UID creamos su fila en 'users'
+    # (las tablas de intentos y progreso tienen FK a users.uid)
+    if not crud_users.is_known_uid(uid):
+        try:
+            await run_in_threadpool(
+                crud_users.ensure_user,
+                db,
+                uid,
+                decoded_token.get("email"),
+                decoded_token.get("name"),
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error de auth: {e}",
+            )
+
+    # 4. Devolvemos el UID para que el endpoint lo use
+    return {"uid": uid}
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Como get_current_user pero para las rutas async (ASYNC_DB=1): el alta
+    del usuario nuevo va por la AsyncSession y no por get_db, asi que la
+    ruta no ocupa el threadpool ni una conexion del pool sync.
+    """
+    decoded_token = await _verify_uid(token)
+    uid = decoded_token["uid"]
+
+    if not crud_users.is_known_uid(uid):
+        try:
+            await db.run_sync(
+                crud_users.ensure_user,
+                uid,
+                decoded_token.get("email"),
+                decoded_token.get("name"),
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error de auth: {e}",
+            )
+
+    return {"uid": uid}
+
+
+async def get_optional_user(
+    token: str = Depends(oauth2_scheme_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    Como get_current_user pero regresa None si no mandaron token.
+    Si mandaron uno invalido si regresamos 401.
+    """
+    if not token:
+        return None
+    return await get_current_user(token=token, db=db)
+
+
+
+async def get_media_expansion(
+    expand: Optional[str] = Query(
+        None,
+        pattern="^media$",
+        description="Usa 'media' para incluir las URLs firmadas de los videos en la respuesta"
+    ),
+    token: Optional[str] = Depends(oauth2_scheme_optional)
+) -> bool:
+    """
+    Dice si hay que expandir la media (?expand=media).
+    Las URLs firmadas solo se dan a usuarios logueados, igual que /media/video.
+    El token solo se revisa con expand=media: una lectura publica con un
+    token viejo en la cabecera sigue funcionando (y no abre sesion de BD).
+    """
+    if expand != "media":
+        return False
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Se requiere autenticacion para expand=media",
+        )
+    await _verify_uid(token)
+    return True
+
+
+
+# --- ETags del catalogo ---
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Dice si la cabecera If-None-Match incluye el ETag. Acepta una lista
+    separada por comas, '*' y ETags debiles (W/"..."): para If-None-Match
+    la comparacion es debil, asi que W/ se ignora de los dos lados.
+    """
+    if not if_none_match:
+        return False
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def check_catalog_etag(request: Request, response: Response):
+    """
+    Dependencia para los endpoints del catalogo (modulos, lecciones,
+    quizzes, diccionario). El ETag sale de la version del catalogo y de
+    la URL, asi que si el cliente ya tiene esa version respondemos 304
+    antes de consultar la BD o serializar nada.
+    """
+    # Con expand=media la respuesta trae URLs firmadas que cambian, sin ETag
+    if request.query_params.get("expand"):
+        return
+
+    url_key = f"{request.url.path}?{request.url.query}".encode("utf-8")
+    etag = f'"c{catalog.get_version()}-{hashlib.sha1(url_key).hexdigest()[:16]}"'
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        )
+
+    # no-cache = el cliente puede guardar la respuesta pero debe revalidar
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(cache_headers)
+    # Para las rutas que regresan su propio Response (camino rapido)
+    request.state.cache_headers = cache_headers
@@ -1,21 +1,42 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware #  CORS para que no se bloquee la app al hacer peticiones
 
 # ---------------------------------------------
 # modulos de la base de datos
 from . import models
-from .database import engine
+from .database import engine, SessionLocal, AsyncSessionLocal, async_engine
+from .crud import dictionary as crud_dictionary
+from .crud import leaderboard as crud_leaderboard
+from . import writebehind
 
 #routers
 
-from .routers import users, modules, dictionary, quizzes, memory, progress, media, missions, lessons
+from .routers import users, modules, dictionary, quizzes, memory, progress, media, missions, lessons, catalog, sync, leaderboard, metrics, hot_async
 
 #----------------------------------------------
 
 #logica de inicio
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Al arrancar construimos los indices en memoria (busqueda del diccionario)
+    # y las tablas de posiciones
+    db = SessionLocal()
+    try:
+        crud_dictionary.warm_up(db)
+    finally:
+        db.close()
+    crud_leaderboard.rebuild()
+    yield
+    # Al apagar guardamos lo que quede en la cola de write-behind
+    writebehind.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 #  instancia de la app de FastAPI
-app = FastAPI(title="EnSeñas API", version="1.0.0")
+app = FastAPI(title="EnSeñas API", version="1.0.0", lifespan=lifespan)
 
 # Configuracion de CORS (Cross-Origin Resource Sharing)
 app.add_middleware(
@@ -26,13 +47,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 #osea, cualu=quiere origen '*' se puede conectar a la api
+
+# Cola de write-behind llena: que el cliente reintente en un momento
+@app.exception_handler(writebehind.BufferFull)
+async def write_behind_full_handler(request: Request, exc: writebehind.BufferFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Demasiados resultados en cola, intenta de nuevo"},
+        headers={"Retry-After": "1"},
+    )
 # -------------------------------------------
 #para todos los modelos que heredan de Base, crea las tablas en la db si no existen
 models.Base.metadata.create_all(bind=engine)
 
+# create_all no agrega indices nuevos a tablas que ya existian, los creamos aparte
+for table in models.Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
 # ---------------------------------------------------
 
 #  Le decimos a la app principal que incluya todas las rutas
+# Con ASYNC_DB=1 las versiones async de los endpoints mas usados van
+# primero para que atiendan ellas esas rutas
+if AsyncSessionLocal is not None:
+    app.include_router(hot_async.router)
 app.include_router(users.router)
 app.include_router(modules.router)
 app.include_router(dictionary.router)
@@ -42,6 +81,10 @@ app.include_router(progress.router)
 app.include_router(media.router)
 app.include_router(missions.router)
 app.include_router(lessons.router)
+app.include_router(catalog.router)
+app.include_router(sync.router)
+app.include_router(leaderboard.router)
+app.include_router(metrics.router)
 
 #-----------------------------------------------------------
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, TEXT, INT, INT, ForeignKey, JSON, Enum
+from sqlalchemy import Column, String, TIMESTAMP, TEXT, INT, INT, ForeignKey, JSON, Enum, Index, Date
 from sqlalchemy.dialects.mysql import TINYINT
 from sqlalchemy.sql import func
 from .database import Base  # heredamos la clase que definimos en database.py
@@ -56,6 +56,14 @@ class Lesson(Base):
     #rel
     module = relationship("Module", back_populates="lessons")
 
+# --- Version del catalogo (para ETags) ---
+
+class CatalogMeta(Base):
+    __tablename__ = "catalog_meta"
+    # Una sola fila (id=1); 'version' sube con cada escritura al catalogo
+    id = Column(INT, primary_key=True)
+    version = Column(INT, nullable=False, default=0)
+
 # --- Diccionario ---
 
 class Sign(Base):
@@ -70,6 +78,11 @@ class Sign(Base):
     #rel
     sign_pairs = relationship("SignPair", back_populates="sign")
 
+    # indice para la paginacion por cursor (word, id)
+    __table_args__ = (
+        Index("ix_signs_word_id", "word", "id"),
+    )
+
 # --- Quizzes ---
 
 class Quiz(Base):
@@ -115,6 +128,29 @@ class UserModuleProgress(Base):
     user = relationship("User", back_populates="progress")
     module = relationship("Module", back_populates="progress")
 
+class UserStats(Base):
+    # Totales por usuario, se actualizan en la misma transaccion que cada
+    # intento, partida o progreso (el dashboard los lee con un solo SELECT)
+    __tablename__ = "user_stats"
+    user_id = Column(String(128), ForeignKey("users.uid"), primary_key=True)
+    total_score = Column(INT, nullable=False, default=0)
+    total_questions = Column(INT, nullable=False, default=0)
+    quiz_time_ms = Column(INT, nullable=False, default=0)
+    memory_time_ms = Column(INT, nullable=False, default=0)
+    mastered_modules = Column(INT, nullable=False, default=0)
+
+class UserDailyActivity(Base):
+    # Resumen por usuario y dia (racha, xp del dia e historial), se actualiza
+    # junto con cada intento o partida. La PK (user_id, day) sirve para
+    # leer rangos de dias sin tocar quiz_attempts ni memory_runs
+    __tablename__ = "user_daily_activity"
+    user_id = Column(String(128), ForeignKey("users.uid"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    quiz_score = Column(INT, nullable=False, default=0)
+    memory_matches = Column(INT, nullable=False, default=0)
+    duration_ms = Column(INT, nullable=False, default=0)
+    activity_count = Column(INT, nullable=False, default=0)
+
 class QuizAttempt(Base):
     __tablename__ = "quiz_attempts"
     id = Column(INT, primary_key=True, autoincrement=True)
@@ -128,6 +164,11 @@ class QuizAttempt(Base):
     user = relationship("User", back_populates="quiz_attempts")
     quiz = relationship("Quiz", back_populates="attempts")
 
+    # indice para el historial por cursor (user_id, created_at, id)
+    __table_args__ = (
+        Index("ix_quiz_attempts_user_created_id", "user_id", "created_at", "id"),
+    )
+
 class MemoryRun(Base):
     __tablename__ = "memory_runs"
     id = Column(INT, primary_key=True, autoincrement=True)
@@ -140,4 +181,15 @@ class MemoryRun(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now()) # [cite: 281]
 
     user = relationship("User", back_populates="memory_runs")
-    module = relationship("Module", back_populates="memory_runs")
\ No newline at end of file
+    module = relationship("Module", back_populates="memory_runs")
+
+# --- Sincronizacion offline ---
+
+class SyncedResult(Base):
+    # Registro de resultados ya sincronizados por su id generado en el cliente,
+    # para que reenviar el mismo lote no duplique intentos
+    __tablename__ = "synced_results"
+    user_id = Column(String(128), ForeignKey("users.uid"), primary_key=True)
+    client_id = Column(String(64), primary_key=True)
+    kind = Column(String(16), nullable=False) # 'quiz_attempt' o 'memory_run'
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -0,0 +1,42 @@
+import json
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException, status
+
+# Paginacion por cursor (keyset): en lugar de OFFSET mandamos la llave
+# del ultimo elemento de la pagina y la siguiente consulta empieza despues
+# de ella, usando el indice. El cursor es opaco para el cliente.
+
+
+def encode_cursor(*values) -> str:
+    """Empaqueta la llave del ultimo elemento (ej. word, id) en un token."""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    data = json.dumps(raw, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """
+    Desempaqueta un cursor validando que traiga un valor por cada tipo.
+    Si viene malformado regresamos 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(raw, list) or len(raw) != len(types):
+            raise ValueError("cursor con longitud incorrecta")
+        values = []
+        for value, value_type in zip(raw, types):
+            if value_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            elif not isinstance(value, value_type):
+                raise ValueError("cursor con tipo incorrecto")
+            else:
+                values.append(value)
+        return tuple(values)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginacion no valido",
+        )
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Request, Response, status
+from sqlalchemy.orm import Session
+
+from ..crud import catalog as crud_catalog
+from .. import schemas
+from ..dependencies import get_db, etag_matches
+
+router = APIRouter(
+    prefix="/catalog",
+    tags=["Catalog"]
+)
+
+@router.get(
+    "",
+    response_model=schemas.CatalogSnapshot,
+    responses={304: {"description": "El cliente ya tiene esta version"}}
+)
+def get_full_catalog(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Regresa todo el catalogo (modulos con lecciones, quizzes sin respuestas
+    y diccionario) en un solo documento, para el primer arranque de la app.
+
+    Se arma una sola vez por version del catalogo y se sirve ya comprimido
+    (brotli o gzip segun Accept-Encoding). Con If-None-Match responde 304.
+    """
+    # La codificacion va primero: cada una tiene su ETag
+    encoding = crud_catalog.choose_encoding(request.headers.get("accept-encoding", ""))
+    etag = crud_catalog.get_catalog_etag(encoding)
+    cache_headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    # 1. Si ya tiene esta version no armamos nada
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    snapshot = crud_catalog.get_catalog_snapshot(db)
+    cache_headers["ETag"] = crud_catalog.catalog_etag(snapshot["version"], encoding)
+
+    # 2. Mandamos los bytes en la codificacion elegida
+    if encoding != "identity":
+        return Response(snapshot[encoding], media_type="application/json",
+                        headers={**cache_headers, "Content-Encoding": encoding})
+    return Response(snapshot["identity"], media_type="application/json", headers=cache_headers)
@@ -1,37 +1,153 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 
 # Importamos el módulo CRUD específico para el diccionario
 from ..crud import dictionary as crud_dictionary
+from ..crud import media as crud_media
 from .. import schemas
-from ..dependencies import get_db
+from ..serialization import FAST_READ_PATH, fast_json_response
+from ..dependencies import get_db, get_media_expansion, check_catalog_etag
 
 router = APIRouter(
     prefix="/dictionary",
     tags=["Dictionary"]
 )
 
-@router.get("/", response_model=List[schemas.Sign])
+class DictionarySearch:
+    """Parametros de GET /dictionary/ (los comparten la version sync y la async)."""
+
+    def __init__(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        # 'Query' nos permite añadir documentacion y validacion a los parametros de la URL
+        query: Optional[str] = Query(None, min_length=1, description="Texto a buscar por prefijo"),
+        category: Optional[str] = Query(None, description="Filtrar por categoria exacta"),
+        mode: str = Query(
+            "prefix",
+            pattern="^(prefix|fuzzy)$",
+            description="'fuzzy' tolera errores de dedo, busca tambien en tags/categoria y ordena por relevancia"
+        ),
+        after: Optional[str] = Query(
+            None,
+            description="Paginacion por cursor: vacio para la primera pagina, luego el next_cursor recibido"
+        ),
+    ):
+        if after is not None and mode == "fuzzy":
+            raise HTTPException(status_code=400, detail="La busqueda fuzzy no soporta cursor, usa skip/limit")
+        self.skip = skip
+        self.limit = limit
+        self.query = query
+        self.category = category
+        self.mode = mode
+        self.after = after
+
+
+def run_dictionary_search(db: Session, search: DictionarySearch, expand_media: bool, request: Request):
+    """
+    Las consultas de GET /dictionary/. Con expand_media regresa schemas
+    listos para expand_dictionary_media (firmar URLs puede bloquear, por
+    eso va aparte). La version async la corre con AsyncSession.run_sync.
+    """
+    if search.after is not None:
+        page = crud_dictionary.get_signs_page(
+            db=db,
+            after=search.after,
+            limit=search.limit,
+            query=search.query,
+            category=search.category
+        )
+        if expand_media:
+            page = schemas.SignPage.model_validate(page, from_attributes=True)
+        return page
+
+    if FAST_READ_PATH and search.mode == "prefix" and not expand_media:
+        # Camino rapido: columnas -> bytes JSON, misma forma que schemas.Sign
+        signs = crud_dictionary.get_signs_fast(
+            db=db,
+            skip=search.skip,
+            limit=search.limit,
+            query=search.query,
+            category=search.category
+        )
+        return fast_json_response(signs, request)
+
+    if search.mode == "fuzzy" and search.query:
+        signs = crud_dictionary.search_signs(
+            db=db,
+            query=search.query,
+            skip=search.skip,
+            limit=search.limit,
+            category=search.category
+        )
+    else:
+        signs = crud_dictionary.get_signs(
+            db=db,
+            skip=search.skip,
+            limit=search.limit,
+            query=search.query,
+            category=search.category
+        )
+    if expand_media:
+        signs = [schemas.Sign.model_validate(sign) for sign in signs]
+    return signs
+
+
+def expand_dictionary_media(result):
+    """Firma las URLs de video de lo que regreso run_dictionary_search."""
+    crud_media.expand_signs(result.items if isinstance(result, schemas.SignPage) else result)
+    return result
+
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.Sign], schemas.SignPage],
+    dependencies=[Depends(check_catalog_etag)]
+)
 def search_dictionary(
+    request: Request,
+    search: DictionarySearch = Depends(),
     db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 20,
-    # 'Query' nos permite añadir documentacion y validacion a los parametros de la URL
-    query: Optional[str] = Query(None, min_length=1, description="Texto a buscar por prefijo"),
-    category: Optional[str] = Query(None, description="Filtrar por categoria exacta")
+    expand_media: bool = Depends(get_media_expansion)
 ):
     """
     Busca señas en el diccionario.
     Permite filtrar por texto (prefijo) y categoria, con paginacion.
+    Con mode=fuzzy la busqueda es difusa y ordenada por relevancia.
+    Con ?expand=media cada seña trae su video_url firmada.
+
+    Si se manda 'after' la respuesta es {items, next_cursor} (paginacion
+    por cursor); sin el se mantiene la lista con skip/limit.
+    """
+    result = run_dictionary_search(db, search, expand_media, request)
+    if expand_media:
+        expand_dictionary_media(result)
+    return result
+
+@router.get("/autocomplete", response_model=List[schemas.SignSuggestion])
+def autocomplete_dictionary(
+    q: str = Query(..., min_length=1, description="Lo que lleva escrito el usuario"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    Sugerencias de señas por prefijo para cada tecla.
+    No distingue mayusculas ni acentos ("senas" encuentra "señas")
+    y se responde desde memoria, sin consultar la BD.
+    """
+    return crud_dictionary.autocomplete(db, prefix=q, limit=limit)
+
+@router.get("/categories", response_model=schemas.DictionaryFacets, dependencies=[Depends(check_catalog_etag)])
+def list_dictionary_categories(
+    tags: bool = Query(False, description="Incluir tambien el conteo por tag"),
+    db: Session = Depends(get_db)
+):
+    """
+    Lista las categorias del diccionario con su numero de señas
+    (para el navegador de categorias de la app). Se responde desde memoria.
     """
-    return crud_dictionary.get_signs(
-        db=db, 
-        skip=skip, 
-        limit=limit, 
-        query=query, 
-        category=category
-    )
+    return crud_dictionary.get_category_facets(db, include_tags=tags)
 
 @router.post("/", 
              response_model=schemas.Sign, 
@@ -0,0 +1,105 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+
+# Versiones async de los endpoints mas usados (juego y diccionario).
+# Solo se registran con ASYNC_DB=1 y van antes que los routers sync,
+# asi que atienden las mismas rutas con la misma respuesta.
+# Firmar URLs (expand=media) puede bloquear, eso si va al threadpool.
+# Nada aqui depende de get_db: el auth usa get_current_user_async.
+from ..crud import memory as crud_memory
+from ..crud import quizzes as crud_quizzes
+from ..crud import media as crud_media
+from .. import schemas
+from ..serialization import json_bytes_response
+from .dictionary import DictionarySearch, run_dictionary_search, expand_dictionary_media
+from ..dependencies import get_async_db, get_current_user_async, get_media_expansion, check_catalog_etag
+
+router = APIRouter()
+
+
+@router.get(
+    "/dictionary/",
+    response_model=Union[List[schemas.Sign], schemas.SignPage],
+    dependencies=[Depends(check_catalog_etag)],
+    tags=["Dictionary"]
+)
+async def search_dictionary(
+    request: Request,
+    search: DictionarySearch = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    expand_media: bool = Depends(get_media_expansion)
+):
+    """Busca señas en el diccionario (version async de GET /dictionary/)."""
+    result = await db.run_sync(run_dictionary_search, search, expand_media, request)
+    if expand_media:
+        await run_in_threadpool(expand_dictionary_media, result)
+    return result
+
+
+@router.get("/memory/deck", response_model=List[schemas.SignPair], tags=["Memory Game"])
+async def get_game_deck(
+    size: int = Query(8, ge=4, le=12, description="Numero de pares (ej. 8 pares = 16 cartas)"),
+    category: Optional[str] = Query(None, description="Solo pares de senas de esta categoria"),
+    db: AsyncSession = Depends(get_async_db),
+    expand_media: bool = Depends(get_media_expansion)
+):
+    """Mazo aleatorio de pares palabra-seña (version async de GET /memory/deck)."""
+    deck = await crud_memory.get_memory_deck_async(db, size=size, category=category)
+    if expand_media:
+        deck = [schemas.SignPair.model_validate(pair) for pair in deck]
+        await run_in_threadpool(crud_media.expand_signs, [pair.sign for pair in deck])
+    return deck
+
+
+@router.post("/memory/attempt", response_model=schemas.MemoryRun, tags=["Memory Game"])
+async def submit_memory_run(
+    run_data: schemas.MemoryRunCreate,
+    response: Response,
+    current_user: dict = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Guarda el resultado de una partida (version async de POST /memory/attempt)."""
+    result = await crud_memory.create_memory_run_async(db, run=run_data, user_id=current_user["uid"])
+    if result.id is None:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return result
+
+
+# ':int' para que /quizzes/my-attempts siga llegando al router sync
+@router.get(
+    "/quizzes/{quiz_id:int}",
+    response_model=schemas.QuizPublic,
+    dependencies=[Depends(check_catalog_etag)],
+    tags=["Quizzes"]
+)
+async def get_quiz_details(
+    quiz_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    expand_media: bool = Depends(get_media_expansion)
+):
+    """Un quiz sin respuestas, desde cache (version async de GET /quizzes/{quiz_id})."""
+    payload = await crud_quizzes.get_quiz_payload_async(db, quiz_id=quiz_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Quiz no encontrado")
+    if expand_media:
+        return await run_in_threadpool(crud_media.expand_quiz, schemas.QuizPublic.model_validate_json(payload))
+    return json_bytes_response(payload, request)
+
+
+@router.post("/quizzes/attempt", response_model=schemas.QuizAttempt, tags=["Quizzes"])
+async def submit_quiz_attempt(
+    attempt: schemas.QuizAttemptCreate,
+    response: Response,
+    current_user: dict = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Califica y guarda un intento (version async de POST /quizzes/attempt)."""
+    result = await crud_quizzes.create_quiz_attempt_async(db, attempt=attempt, user_id=current_user["uid"])
+    if not result:
+        raise HTTPException(status_code=404, detail="Quiz no encontrado")
+    if result.id is None:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return result
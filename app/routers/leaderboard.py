@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional, Literal
+
+from ..crud import leaderboard as crud_leaderboard
+from .. import schemas
+from ..dependencies import get_db, get_optional_user
+
+router = APIRouter(
+    prefix="/leaderboard",
+    tags=["Leaderboard"]
+)
+
+@router.get("", response_model=schemas.Leaderboard)
+def get_leaderboard(
+    period: Literal["daily", "weekly", "all"] = Query("weekly"),
+    module_id: Optional[int] = Query(None, description="Tabla de un modulo (vacio = global)"),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Optional[dict] = Depends(get_optional_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Tabla de posiciones por xp (aciertos de quiz x10 + pares de memorama x5)
+    del dia, de la semana o de siempre, global o de un modulo.
+    Si se manda token tambien regresa el lugar del usuario en 'me' y marca
+    su fila con is_me; de los demas solo se regresa lugar, nombre y xp.
+    """
+    user_id = current_user["uid"] if current_user else None
+    return crud_leaderboard.get_leaderboard(db, period=period, module_id=module_id, limit=limit, user_id=user_id)
@@ -4,14 +4,14 @@ from typing import List
 
 from .. import schemas
 from ..crud import lessons as crud_lessons
-from ..dependencies import get_db
+from ..dependencies import get_db, check_catalog_etag
 
 router = APIRouter(
     prefix="/lessons",
     tags=["Lessons"]
 )
 
-@router.get("/", response_model=List[schemas.Lesson])
+@router.get("/", response_model=List[schemas.Lesson], dependencies=[Depends(check_catalog_etag)])
 def read_lessons(
     module_id: int,
     db: Session = Depends(get_db)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
 
 from ..crud import media as crud_media
-from ..dependencies import get_db, get_current_user
+from .. import schemas, storage
+from ..dependencies import get_db, get_current_user, etag_matches
 
 router = APIRouter(
     prefix="/media",
@@ -29,4 +31,83 @@ def get_video_url_for_sign(
         
     # El response_model=str se encarga de devolver la URL
     # como un string simple, no como un JSON.
-    return url
\ No newline at end of file
+    return url
+
+@router.post("/videos", response_model=schemas.SignVideosResponse)
+def get_video_urls_for_signs(
+    request: schemas.SignVideosRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    (Protegido) Obtiene las URLs de video de varias senas en una sola llamada
+    (ej. todas las cartas de un mazo o una pagina del diccionario).
+
+    Las senas que no existen o no se pudieron firmar se reportan en 'errors'
+    sin fallar todo el lote.
+    """
+    sign_ids = list(dict.fromkeys(request.sign_ids)) # sin duplicados, mismo orden
+    paths = crud_media.get_video_paths(db, sign_ids)
+    urls = crud_media.sign_video_paths(paths.values())
+
+    response = schemas.SignVideosResponse()
+    for sign_id in sign_ids:
+        if sign_id not in paths:
+            response.errors[sign_id] = "not_found"
+        elif not urls.get(paths[sign_id]):
+            response.errors[sign_id] = "sign_error"
+        else:
+            response.urls[sign_id] = urls[paths[sign_id]]
+    return response
+
+
+@router.get("/files/{path:path}", include_in_schema=False)
+def serve_local_file(
+    path: str,
+    expires: int,
+    signature: str,
+    request: Request
+):
+    """
+    Sirve un video del backend local (MEDIA_BACKEND=local).
+    La URL viene de /media/video o /media/videos y caduca en 10 minutos.
+
+    FileResponse soporta Range (para adelantar el video), manda ETag y
+    Last-Modified, y si el servidor lo soporta usa sendfile (pathsend).
+    """
+    backend = storage.get_backend()
+    if not isinstance(backend, storage.LocalStorageBackend):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    if not backend.verify(path, expires, signature):
+        raise HTTPException(status_code=403, detail="URL no valida o expirada")
+
+    full_path = backend.resolve(path)
+    if full_path is None:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    response = FileResponse(
+        full_path,
+        stat_result=full_path.stat(),
+        headers={"Cache-Control": "private, max-age=600"},
+    )
+
+    # Si el cliente ya tiene el archivo regresamos 304 sin mandar nada
+    if etag_matches(request.headers.get("if-none-match"), response.headers["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={
+            "etag": response.headers["etag"],
+            "cache-control": response.headers["cache-control"],
+        })
+
+    return response
+
+
+@router.get("/cache-stats")
+def get_media_cache_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Contadores (hits, misses, evictions) de los caches de URLs firmadas
+    y de rutas de video. Requiere sesion iniciada.
+    """
+    return crud_media.get_cache_stats()
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..crud import memory as crud_memory
+from ..crud import media as crud_media
 from .. import schemas
-from ..dependencies import get_db, get_current_user
+from ..dependencies import get_db, get_current_user, get_media_expansion
 
 router = APIRouter(
     prefix="/memory",
@@ -14,27 +15,38 @@ router = APIRouter(
 @router.get("/deck", response_model=List[schemas.SignPair])
 def get_game_deck(
     size: int = Query(8, ge=4, le=12, description="Numero de pares (ej. 8 pares = 16 cartas)"),
-    db: Session = Depends(get_db)
+    category: Optional[str] = Query(None, description="Solo pares de senas de esta categoria"),
+    db: Session = Depends(get_db),
+    expand_media: bool = Depends(get_media_expansion)
 ):
     """
     Obtiene un mazo aleatorio de pares palabra-seña para el juego.
+    Con ?expand=media cada carta trae la URL firmada de su video.
     """
-    deck = crud_memory.get_memory_deck(db, size=size)
+    deck = crud_memory.get_memory_deck(db, size=size, category=category)
+    if expand_media:
+        deck = [schemas.SignPair.model_validate(pair) for pair in deck]
+        crud_media.expand_signs([pair.sign for pair in deck])
     return deck
 
 @router.post("/attempt", response_model=schemas.MemoryRun)
 def submit_memory_run(
     run_data: schemas.MemoryRunCreate,
+    response: Response,
     # prtgdo Solo usuarios logueados pueden guardar su puntaje
     current_user: dict = Depends(get_current_user), 
     db: Session = Depends(get_db)
 ):
     """
     Guarda el resultado (intentos, duracion, etc) de una partida.
+    Con write-behind activo responde 202 (encolado, todavia sin id).
     Requiere autenticacin.
     """
     user_id = current_user["uid"]
-    return crud_memory.create_memory_run(db, run=run_data, user_id=user_id)
+    result = crud_memory.create_memory_run(db, run=run_data, user_id=user_id)
+    if result.id is None:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return result
 
 
 # --- Endpoint Temporal para crear pares  ---
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+
+from .. import writebehind
+from ..dependencies import get_current_user
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Monitoring"]
+)
+
+@router.get("/write-behind")
+def get_write_behind_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Estado de la cola de write-behind: profundidad, filas escritas,
+    pendientes, rechazadas o descartadas y latencia de los flushes (ms).
+    Requiere sesion iniciada.
+    """
+    return writebehind.get_metrics()
@@ -4,6 +4,8 @@ from typing import List
 
 from .. import schemas
 from ..crud import missions as crud_missions # Importamos su propio crud
+from ..crud import quizzes as crud_quizzes
+from ..serialization import json_bytes_response, join_json_array
 from ..dependencies import get_db, get_current_user
 
 router = APIRouter(
@@ -11,13 +13,16 @@ router = APIRouter(
     tags=["Gamification"] # Le damos su propia cat en la swagger
 )
 
-@router.get("/daily", response_model=List[schemas.Quiz])
+@router.get("/daily", response_model=List[schemas.QuizPublic])
 def get_daily_missions(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Obtiene las 3 misiones diarias activas para el usuario.
+    Los quizzes van sin respuestas y salen ya serializados del cache.
     """
     user_id = current_user["uid"]
-    return crud_missions.get_daily_missions(db, user_id=user_id)
\ No newline at end of file
+    quiz_ids = crud_missions.get_daily_missions(db, user_id=user_id)
+    payloads = crud_quizzes.get_quiz_payloads(db, quiz_ids)
+    return json_bytes_response(join_json_array(payloads[quiz_id] for quiz_id in quiz_ids if quiz_id in payloads))
\ No newline at end of file
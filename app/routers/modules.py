@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
 from .. import schemas # Importamos el crud y los esquemas
-from ..dependencies import get_db # Importamos el conector a la BD
+from ..dependencies import get_db, check_catalog_etag # Importamos el conector a la BD
 from ..crud import modules as crud_modules
+from ..serialization import FAST_READ_PATH, fast_json_response
 
 
 #router
@@ -13,15 +14,23 @@ router = APIRouter(
     tags=["Modules"]    # Se agruparan como "Modules" en /docs
 )
 
-@router.get("/", response_model=List[schemas.Module])
+@router.get("/", response_model=Union[List[schemas.Module], schemas.ModulePage], dependencies=[Depends(check_catalog_etag)])
 def read_modules(
+    request: Request,
     db: Session = Depends(get_db), 
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    after: Optional[str] = Query(None, description="Paginacion por cursor (vacio = primera pagina)")
 ):
     """
     Obtiene una lista de todos los mmdulos
+    Con 'after' regresa {items, next_cursor} en lugar de la lista.
     """
+    if after is not None:
+        return crud_modules.get_modules_page(db, after=after, limit=limit)
+    if FAST_READ_PATH:
+        modules = crud_modules.get_modules_fast(db, skip=skip, limit=limit)
+        return fast_json_response(modules, request)
     return crud_modules.get_modules(db, skip=skip, limit=limit)
 
 @router.post("/", 
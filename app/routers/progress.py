@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -18,11 +18,24 @@ def update_my_progress(
 ):
     """
     (Protegido) Actualiza (o crea) el porcentaje de progreso 
-    de un usuario en un modulo especifico.
+    de un usuario en un modulo especifico. El percent nunca baja.
     """
     user_id = current_user["uid"]
     return crud_progress.upsert_user_progress(db, user_id=user_id, progress_in=progress_in)
 
+@router.post("/progress/batch", response_model=List[schemas.UserModuleProgress])
+def update_my_progress_batch(
+    batch: schemas.UserModuleProgressBatch,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    (Protegido) Actualiza el progreso de varios modulos en una sola
+    sentencia. El percent nunca baja (se queda el mayor).
+    """
+    user_id = current_user["uid"]
+    return crud_progress.upsert_progress_batch(db, user_id=user_id, items=batch.items)
+
 @router.get("/progress", response_model=List[schemas.UserModuleProgress])
 def get_my_progress(
     current_user: dict = Depends(get_current_user),
@@ -45,4 +58,17 @@ def get_my_stats_summary(
     (precision, tiempo, etc.) para el dashboard del usuario.
     """
     user_id = current_user["uid"]
-    return crud_progress.get_user_stats_summary(db, user_id=user_id)
\ No newline at end of file
+    return crud_progress.get_user_stats_summary(db, user_id=user_id)
+
+@router.get("/stats/activity", response_model=List[schemas.DailyActivity])
+def get_my_activity_history(
+    days: int = Query(30, ge=1, le=crud_progress.ACTIVITY_HISTORY_MAX_DAYS),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    (Protegido) Actividad de los ultimos N dias (xp, puntos, tiempo),
+    un elemento por dia del mas antiguo al mas reciente.
+    """
+    user_id = current_user["uid"]
+    return crud_progress.get_activity_history(db, user_id=user_id, days=days)
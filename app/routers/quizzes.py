@@ -1,51 +1,84 @@
 from .. import models
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
 from ..crud import quizzes as crud_quizzes
+from ..crud import media as crud_media
 from .. import schemas
-from ..dependencies import get_db, get_current_user
+from ..serialization import json_bytes_response, join_json_array
+from ..dependencies import get_db, get_current_user, get_media_expansion, check_catalog_etag
 
 router = APIRouter(
     prefix="/quizzes",
     tags=["Quizzes"]
 )
 
-@router.get("/", response_model=List[schemas.Quiz])
+@router.get("/", response_model=List[schemas.QuizPublic], dependencies=[Depends(check_catalog_etag)])
 def get_quizzes_for_module(
     module_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Obtiene la lista de quizzes disponibles para un modulo especifico.
+    Las preguntas van sin la respuesta correcta (se califica en el servidor).
     """
-    quizzes = crud_quizzes.get_quiz_by_module(db, module_id=module_id)
-    return quizzes
+    quiz_ids = crud_quizzes.get_quiz_ids_by_module(db, module_id=module_id)
+    payloads = crud_quizzes.get_quiz_payloads(db, quiz_ids)
+    body = join_json_array(payloads[quiz_id] for quiz_id in quiz_ids if quiz_id in payloads)
+    return json_bytes_response(body, request)
 
-@router.get("/{quiz_id}", response_model=schemas.Quiz)
+@router.get("/my-attempts", response_model=Union[List[schemas.QuizAttempt], schemas.QuizAttemptPage])
+def get_my_attempts(
+    skip: int = 0,
+    limit: int = 50,
+    after: Optional[str] = Query(None, description="Paginacion por cursor (vacio = primera pagina)"),
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene el historial de intentos del usuario actual.
+    (Va antes de /{quiz_id} para que 'my-attempts' no se tome como id)
+    Con 'after' regresa {items, next_cursor} en lugar de la lista.
+    Requiere autenticacion.
+    """
+    user_id = current_user["uid"]
+    if after is not None:
+        return crud_quizzes.get_user_attempts_page(db, user_id=user_id, after=after, limit=limit)
+    return crud_quizzes.get_user_attempts(db, user_id=user_id, skip=skip, limit=limit)
+
+@router.get("/{quiz_id}", response_model=schemas.QuizPublic, dependencies=[Depends(check_catalog_etag)])
 def get_quiz_details(
     quiz_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db),
+    expand_media: bool = Depends(get_media_expansion)
 ):
     """
-    Obtiene los detalles de un quiz especifico, incluyendo sus preguntas.
+    Obtiene los detalles de un quiz especifico, incluyendo sus preguntas
+    (sin la respuesta correcta). Se sirve ya serializado desde cache.
+    Con ?expand=media cada pregunta trae las URLs firmadas de sus opciones.
     """
-    quiz = crud_quizzes.get_quiz(db, quiz_id=quiz_id)
-    if not quiz:
+    payload = crud_quizzes.get_quiz_payload(db, quiz_id=quiz_id)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Quiz no encontrado")
-    return quiz
+    if expand_media:
+        return crud_media.expand_quiz(schemas.QuizPublic.model_validate_json(payload))
+    return json_bytes_response(payload, request)
 
 @router.post("/attempt", response_model=schemas.QuizAttempt)
 def submit_quiz_attempt(
     attempt: schemas.QuizAttemptCreate,
+    response: Response,
     # prot Solo usuarios autenticados pueden enviar intentos
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Recibe las respuestas de un usuario, calcula su calificacion y guarda el intento.
+    Con write-behind activo responde 202 (encolado, todavia sin id).
     Requiere autenticacion.
     """
     user_id = current_user["uid"]
@@ -53,23 +86,11 @@ def submit_quiz_attempt(
     
     if not result:
         raise HTTPException(status_code=404, detail="Quiz no encontrado")
+    if result.id is None:
+        response.status_code = status.HTTP_202_ACCEPTED
         
     return result
 
-@router.get("/my-attempts", response_model=List[schemas.QuizAttempt])
-def get_my_attempts(
-    skip: int = 0,
-    limit: int = 50,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Obtiene el historial de intentos del usuario actual.
-    Requiere autenticacion.
-    """
-    user_id = current_user["uid"]
-    return crud_quizzes.get_user_attempts(db, user_id=user_id, skip=skip, limit=limit)
-
 @router.post("/", response_model=schemas.Quiz, status_code=status.HTTP_201_CREATED)
 def create_full_quiz(
     quiz: schemas.QuizCreateFull, 
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..crud import sync as crud_sync
+from .. import schemas
+from ..dependencies import get_db, get_current_user
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+@router.post("/results", response_model=schemas.SyncResultsResponse)
+def sync_offline_results(
+    batch: schemas.SyncResultsRequest,
+    current_user: dict = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    (Protegido) Sube de golpe los resultados que la app junto sin conexion
+    (intentos de quiz y partidas de memorama mezclados).
+
+    Todo se guarda en una sola transaccion y se regresa un resultado por
+    item. Cada item lleva un client_id, asi que reenviar el mismo lote
+    (ej. si se corto la red) no duplica nada.
+    """
+    user_id = current_user["uid"]
+    results = crud_sync.sync_results(db, user_id=user_id, items=batch.items)
+    return schemas.SyncResultsResponse(results=results)
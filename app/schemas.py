@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, conint
-from datetime import datetime
-from typing import Optional, List, Any
+from pydantic import BaseModel, EmailStr, conint, Field
+from datetime import datetime, date
+from typing import Optional, List, Any, Dict, Union, Literal, Annotated
 
 # esquema base para los usuarios
 # campos comunes, por el momento
@@ -56,6 +56,11 @@ class Module(ModuleBase):
     class Config:
         from_attributes = True
 
+class ModulePage(BaseModel):
+    # Pagina por cursor: se pide la siguiente con ?after=<next_cursor>
+    items: List[Module]
+    next_cursor: Optional[str] = None
+
 # --- Esquemas de Diccionario ---
 class SignBase(BaseModel):
     word: str
@@ -69,9 +74,39 @@ class SignCreate(SignBase):
 
 class Sign(SignBase):
     id: int
+    # Solo se llenan con ?expand=media (URLs firmadas y temporales)
+    video_url: Optional[str] = None
+    thumb_url: Optional[str] = None
     class Config:
         from_attributes = True
 
+class SignPage(BaseModel):
+    items: List[Sign]
+    next_cursor: Optional[str] = None
+
+class SignSuggestion(BaseModel):
+    # Resultado ligero para el autocompletado
+    id: int
+    word: str
+
+class DictionaryFacets(BaseModel):
+    # categoria -> numero de señas
+    categories: Dict[str, int] = {}
+    # tag -> numero de señas (solo si se pide con ?tags=true)
+    tags: Optional[Dict[str, int]] = None
+
+# --- Esquemas de Media ---
+
+class SignVideosRequest(BaseModel):
+    # Maximo 50 por peticion (un mazo o una pagina del diccionario)
+    sign_ids: List[int] = Field(..., min_length=1, max_length=50)
+
+class SignVideosResponse(BaseModel):
+    # sign_id -> URL firmada
+    urls: Dict[int, str] = {}
+    # sign_id -> motivo por el que no hay URL ('not_found' o 'sign_error')
+    errors: Dict[int, str] = {}
+
 # --- Esquemas de Quizzes ---
 
 class QuizQuestionBase(BaseModel):
@@ -85,6 +120,19 @@ class QuizQuestionCreate(QuizQuestionBase):
 class QuizQuestion(QuizQuestionBase):
     id: int
     quiz_id: int
+    # Solo con ?expand=media: opcion -> URL firmada del video
+    option_urls: Optional[Dict[str, Optional[str]]] = None
+    class Config:
+        from_attributes = True
+
+# Pregunta como la ve la app: sin la respuesta correcta
+class QuizQuestionPublic(BaseModel):
+    id: int
+    quiz_id: int
+    prompt: str
+    options: Optional[dict] = None
+    # Solo con ?expand=media: opcion -> URL firmada del video
+    option_urls: Optional[Dict[str, Optional[str]]] = None
     class Config:
         from_attributes = True
 
@@ -106,6 +154,13 @@ class Quiz(QuizBase):
     class Config:
         from_attributes = True
 
+class QuizPublic(QuizBase):
+    id: int
+    module_id: int
+    questions: List[QuizQuestionPublic] = []
+    class Config:
+        from_attributes = True
+
 #esquema de progreso y stats
 class UserModuleProgressBase(BaseModel):
     # conint = integer con restricciones (0 a 100)
@@ -114,6 +169,9 @@ class UserModuleProgressBase(BaseModel):
 class UserModuleProgressCreate(UserModuleProgressBase):
     module_id: int
 
+class UserModuleProgressBatch(BaseModel):
+    items: List[UserModuleProgressCreate] = Field(..., min_length=1, max_length=200)
+
 class UserModuleProgress(UserModuleProgressBase):
     user_id: str
     module_id: int
@@ -131,13 +189,17 @@ class QuizAttemptCreate(QuizAttemptBase):
     answers: Any # Recibimos las respuestas en cualquier formato
 
 class QuizAttempt(QuizAttemptBase):
-    id: int
+    id: Optional[int] = None  # None si se encolo con write-behind (202)
     user_id: str
     quiz_id: int
     created_at: datetime
     class Config:
         from_attributes = True
 
+class QuizAttemptPage(BaseModel):
+    items: List[QuizAttempt]
+    next_cursor: Optional[str] = None
+
 # --- Esquemas de SignPair (Memory Match) ---
 class SignPairBase(BaseModel):
     word: str
@@ -165,7 +227,7 @@ class MemoryRunCreate(MemoryRunBase):
     pass
 
 class MemoryRun(MemoryRunBase):
-    id: int
+    id: Optional[int] = None  # None si se encolo con write-behind (202)
     user_id: str
     created_at: datetime
     
@@ -181,4 +243,72 @@ class StatsSummary(BaseModel):
     senas_dominadas: int = 0
     daily_xp: int = 0  # <--- NUEVO CAMPO
 
-    
\ No newline at end of file
+class LeaderboardEntry(BaseModel):
+    rank: int
+    name: Optional[str] = None
+    xp: int
+    is_me: bool = False  # True en la fila del usuario que pregunta
+
+class Leaderboard(BaseModel):
+    period: Literal["daily", "weekly", "all"]
+    module_id: Optional[int] = None
+    entries: List[LeaderboardEntry]
+    me: Optional[LeaderboardEntry] = None  # lugar del usuario que pregunta (si mando token)
+
+class DailyActivity(BaseModel):
+    day: date
+    quiz_score: int = 0
+    memory_matches: int = 0
+    duration_ms: int = 0
+    activity_count: int = 0
+    xp: int = 0
+
+    
+
+# --- Catalogo completo (snapshot para el primer arranque de la app) ---
+
+class CatalogSign(SignBase):
+    # Como Sign pero sin los campos de expand=media
+    id: int
+    class Config:
+        from_attributes = True
+
+class CatalogSnapshot(BaseModel):
+    version: int
+    modules: List[Module] = []
+    quizzes: List[QuizPublic] = []
+    signs: List[CatalogSign] = []
+
+
+# --- Sincronizacion offline (lote de resultados) ---
+
+class SyncQuizAttempt(BaseModel):
+    kind: Literal["quiz_attempt"]
+    # id generado en el cliente (ej. UUID) para que reenviar sea seguro
+    client_id: str = Field(..., min_length=1, max_length=64)
+    quiz_id: int
+    answers: Any
+    duration_ms: Optional[int] = None
+    # cuando se jugo (offline), si no viene usamos la hora de llegada
+    created_at: Optional[datetime] = None
+
+class SyncMemoryRun(MemoryRunBase):
+    kind: Literal["memory_run"]
+    client_id: str = Field(..., min_length=1, max_length=64)
+    created_at: Optional[datetime] = None
+
+SyncItem = Annotated[Union[SyncQuizAttempt, SyncMemoryRun], Field(discriminator="kind")]
+
+class SyncResultsRequest(BaseModel):
+    items: List[SyncItem] = Field(..., min_length=1, max_length=200)
+
+class SyncItemResult(BaseModel):
+    client_id: str
+    kind: str
+    status: str # 'created', 'duplicate' o 'error'
+    score: Optional[int] = None
+    total: Optional[int] = None
+    detail: Optional[str] = None
+
+class SyncResultsResponse(BaseModel):
+    results: List[SyncItemResult] = []
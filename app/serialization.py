@@ -0,0 +1,52 @@
+import os
+import json
+from datetime import datetime, date
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson # encoder rapido, si no esta usamos json de la libreria estandar
+except ImportError:
+    orjson = None
+
+# Camino rapido de lectura: los endpoints mas usados seleccionan solo las
+# columnas necesarias y las convierten directo a bytes JSON, sin pasar por
+# objetos ORM ni por la validacion de Pydantic. Se puede apagar con 0.
+FAST_READ_PATH = os.getenv("FAST_READ_PATH", "1") == "1"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"No se puede serializar {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Serializa a bytes JSON (mismo formato compacto que JSONResponse)."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def json_bytes_response(body: bytes, request: Request = None) -> Response:
+    """
+    Respuesta con el JSON ya serializado. Copia los headers de cache que
+    haya dejado check_catalog_etag (ETag, Cache-Control) en request.state.
+    """
+    headers = None
+    if request is not None:
+        headers = getattr(request.state, "cache_headers", None)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def fast_json_response(content, request: Request = None) -> Response:
+    """Serializa 'content' y lo regresa como json_bytes_response."""
+    return json_bytes_response(dumps(content), request)
+
+
+def join_json_array(payloads) -> bytes:
+    """Une varios JSON ya serializados (bytes) en un arreglo JSON."""
+    return b"[" + b",".join(payloads) + b"]"
@@ -0,0 +1,107 @@
+import os
+import time
+import hmac
+import base64
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import quote
+
+from firebase_admin import storage
+
+# Backends de almacenamiento para los videos.
+# 'firebase' (default): firma URLs de Firebase Storage.
+# 'local': sirve los archivos desde una carpeta con URLs firmadas con HMAC
+#          (para on-prem, pruebas offline o pruebas de carga).
+MEDIA_BACKEND = os.getenv("MEDIA_BACKEND", "firebase")
+MEDIA_LOCAL_ROOT = os.getenv("MEDIA_LOCAL_ROOT", "./media")
+# Base publica de la API (ej. "https://api.ejemplo.com"), vacia = URL relativa
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", "")
+# Si corren varios workers todos deben tener el mismo secreto
+MEDIA_SIGNING_SECRET = os.getenv("MEDIA_SIGNING_SECRET")
+
+
+class StorageBackend(ABC):
+    """Interfaz comun: dado un video_path regresa una URL temporal."""
+
+    name = "base"
+
+    @abstractmethod
+    def sign_url(self, path: str, expiration: timedelta) -> str:
+        """URL firmada para 'path' que vence en 'expiration'."""
+
+
+class FirebaseStorageBackend(StorageBackend):
+    """Firma URLs del bucket por defecto de Firebase Storage."""
+
+    name = "firebase"
+
+    def sign_url(self, path: str, expiration: timedelta) -> str:
+        # revisar que 'firebase-service-account.json' tenga permisos
+        bucket = storage.bucket() # Usa el bucket por defecto configurado
+        blob = bucket.blob(path)
+        return blob.generate_signed_url(expiration=expiration)
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Sirve los videos desde una carpeta local.
+    Las URLs apuntan a GET /media/files/{path} y llevan una firma HMAC
+    con su fecha de expiracion.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, secret: bytes = None, base_url: str = ""):
+        self.root = Path(root).resolve()
+        if secret is None:
+            print("ADVERTENCIA: MEDIA_SIGNING_SECRET no definido, usando uno aleatorio por proceso.")
+            secret = os.urandom(32)
+        self.secret = secret if isinstance(secret, bytes) else secret.encode("utf-8")
+        self.base_url = base_url.rstrip("/")
+
+    def _signature(self, path: str, expires: int) -> str:
+        message = f"{path}\n{expires}".encode("utf-8")
+        digest = hmac.new(self.secret, message, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+    def sign_url(self, path: str, expiration: timedelta) -> str:
+        expires = int(time.time() + expiration.total_seconds())
+        signature = self._signature(path, expires)
+        return f"{self.base_url}/media/files/{quote(path)}?expires={expires}&signature={signature}"
+
+    def verify(self, path: str, expires: int, signature: str) -> bool:
+        """Valida la firma y que la URL no haya caducado."""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(path, expires), signature)
+
+    def resolve(self, path: str):
+        """
+        Regresa la ruta absoluta del archivo o None si no existe
+        o si intenta salirse de la carpeta raiz (ej. '../').
+        """
+        full_path = (self.root / path).resolve()
+        if not full_path.is_relative_to(self.root) or not full_path.is_file():
+            return None
+        return full_path
+
+
+def _create_backend() -> StorageBackend:
+    if MEDIA_BACKEND == "local":
+        return LocalStorageBackend(MEDIA_LOCAL_ROOT, MEDIA_SIGNING_SECRET, MEDIA_BASE_URL)
+    return FirebaseStorageBackend()
+
+
+_backend = _create_backend()
+
+
+def get_backend() -> StorageBackend:
+    return _backend
+
+
+def set_backend(backend: StorageBackend):
+    """Cambia el backend (ej. en pruebas o benchmarks)."""
+    global _backend
+    _backend = backend
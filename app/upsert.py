@@ -0,0 +1,78 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+
+# UPSERT nativo segun el motor (una sola sentencia en lugar de SELECT + INSERT/UPDATE):
+#   MySQL:            INSERT ... ON DUPLICATE KEY UPDATE
+#   SQLite/Postgres:  INSERT ... ON CONFLICT (pk) DO UPDATE
+
+
+def dialect_insert(db: Session, table):
+    """Regresa el insert() del dialecto de la sesion para 'table'."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        return mysql.insert(table)
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def _new_value(stmt, dialect: str, column: str):
+    # El valor que se intento insertar (VALUES(col) en MySQL, excluded.col en los demas)
+    if dialect == "mysql":
+        return stmt.inserted[column]
+    return stmt.excluded[column]
+
+
+def greatest(db: Session, *values):
+    """GREATEST(a, b, ...) en MySQL/Postgres; en SQLite es MAX(a, b, ...) (escalar)."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.max(*values)
+    return func.greatest(*values)
+
+
+def insert_ignore(db: Session, model, rows):
+    """
+    INSERT de una o varias filas que se salta las que ya existen.
+    Regresa cuantas filas se insertaron de verdad.
+    """
+    stmt = dialect_insert(db, model.__table__).values(rows)
+    if db.get_bind().dialect.name == "mysql":
+        stmt = stmt.prefix_with("IGNORE")
+    else:
+        stmt = stmt.on_conflict_do_nothing()
+    return db.execute(stmt).rowcount
+
+
+def upsert(db: Session, model, rows, update_values):
+    """
+    INSERT de una o varias filas; si la llave primaria ya existe actualiza
+    con 'update_values(tabla, nuevo)', donde nuevo(col) es el valor que se
+    intento insertar. Ej. para sumar: lambda t, new: {"x": t.c.x + new("x")}
+    """
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    stmt = dialect_insert(db, table).values(rows)
+    set_ = update_values(table, lambda column: _new_value(stmt, dialect, column))
+
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update(set_)
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key.columns],
+            set_=set_,
+        )
+    return db.execute(stmt)
+
+
+def upsert_increment(db: Session, model, key: dict, increments: dict):
+    """
+    Suma 'increments' a la fila con llave 'key' (creandola si no existe)
+    en una sola sentencia atomica.
+    """
+    return upsert(
+        db,
+        model,
+        [{**key, **increments}],
+        lambda table, new: {column: table.c[column] + new(column) for column in increments},
+    )
@@ -0,0 +1,331 @@
+import os
+import time
+import queue
+import threading
+from collections import defaultdict
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError, InterfaceError
+
+from . import models
+from .database import SessionLocal
+from .crud import stats as crud_stats
+from .crud import leaderboard as crud_leaderboard
+
+# Write-behind opcional para los resultados de juego (quiz_attempts y
+# memory_runs). Con WRITE_BEHIND=1 los endpoints califican, encolan la fila
+# y responden 202 sin esperar a la BD; un hilo las guarda en lotes (un INSERT
+# masivo por tabla y un solo commit) cuando se junta WRITE_BEHIND_MAX_BATCH
+# filas o pasan WRITE_BEHIND_FLUSH_MS.
+#
+# Lo que se gana en latencia se pierde en durabilidad: si el proceso muere
+# sin apagarse bien se pierde lo que estaba en la cola (a lo mas
+# WRITE_BEHIND_FLUSH_MS de resultados). Al apagar (lifespan) se vacia la cola.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "200"))
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "250"))
+# Tamano maximo de la cola; si se llena, encolar espera hasta
+# WRITE_BEHIND_PUT_TIMEOUT_MS y despues rechaza (el endpoint responde 503).
+# Los endpoints async no esperan (no bloquean el loop): rechazan de una vez
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "5000"))
+WRITE_BEHIND_PUT_TIMEOUT_MS = int(os.getenv("WRITE_BEHIND_PUT_TIMEOUT_MS", "1000"))
+# Si la BD no responde (conexion caida, timeout) el lote se sigue
+# reintentando, esperando cada vez mas hasta este tope; mientras tanto la
+# cola se llena y los endpoints responden 503. Si el lote falla por sus
+# datos se guarda fila por fila y solo se descartan las filas malas.
+WRITE_BEHIND_MAX_BACKOFF_MS = int(os.getenv("WRITE_BEHIND_MAX_BACKOFF_MS", "5000"))
+
+# Resultado de intentar guardar un lote
+_WRITTEN = "written"
+_BAD_DATA = "bad_data"      # error de los datos: reintentar no sirve
+_UNAVAILABLE = "unavailable"  # error de la BD: vale la pena reintentar
+_GAVE_UP = "gave_up"        # se apago el proceso sin que volviera la BD
+
+QUIZ_ATTEMPT = "quiz_attempt"
+MEMORY_RUN = "memory_run"
+
+
+class BufferFull(Exception):
+    """La cola sigue llena despues de esperar WRITE_BEHIND_PUT_TIMEOUT_MS."""
+
+
+def _group_by_user(rows) -> dict:
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row["user_id"]].append(row)
+    return grouped
+
+
+def _split(batch):
+    quiz_rows = [row for kind, row in batch if kind == QUIZ_ATTEMPT]
+    memory_rows = [row for kind, row in batch if kind == MEMORY_RUN]
+    return quiz_rows, memory_rows
+
+
+def write_results(db, batch):
+    """
+    Guarda un lote de (tipo, fila) en una transaccion: un INSERT masivo por
+    tabla y los totales de cada usuario.
+    """
+    quiz_rows, memory_rows = _split(batch)
+
+    crud_stats.ensure_user_stats(db, {row["user_id"] for row in quiz_rows + memory_rows})
+    if quiz_rows:
+        db.execute(insert(models.QuizAttempt), quiz_rows)
+    if memory_rows:
+        db.execute(insert(models.MemoryRun), memory_rows)
+    for user_id, rows in _group_by_user(quiz_rows).items():
+        crud_stats.record_quiz_attempts(db, user_id, rows)
+    for user_id, rows in _group_by_user(memory_rows).items():
+        crud_stats.record_memory_runs(db, user_id, rows)
+    db.commit()
+
+
+def record_leaderboards(db, batch):
+    """
+    Suma a las tablas de posiciones un lote ya guardado. Va aparte de
+    write_results para que un error aqui no haga reintentar (y duplicar)
+    filas que ya estan en la BD.
+    """
+    quiz_rows, memory_rows = _split(batch)
+    for user_id, rows in _group_by_user(quiz_rows).items():
+        crud_leaderboard.record_quiz_attempts(db, user_id, rows)
+    for user_id, rows in _group_by_user(memory_rows).items():
+        crud_leaderboard.record_memory_runs(user_id, rows)
+
+
+def _is_unavailable(error: Exception) -> bool:
+    """
+    Errores de la BD y no de los datos (conexion perdida, servidor caido,
+    lock timeout): el mismo lote puede entrar si se reintenta. Cualquier
+    otro error (IntegrityError, DataError, tipos invalidos...) se repetiria
+    igual, asi que se trata como fila mala.
+    """
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class WriteBehindBuffer:
+    """Cola acotada en memoria + un hilo que la vacia por lotes."""
+
+    def __init__(self, max_queue: int, max_batch: int, flush_ms: int, put_timeout_ms: int, max_backoff_ms: int):
+        self.max_batch = max_batch
+        self.flush_interval = flush_ms / 1000
+        self.put_timeout = put_timeout_ms / 1000
+        self.max_backoff = max_backoff_ms / 1000
+        self._give_up_at = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "pending": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def submit(self, kind: str, row: dict, block: bool = True):
+        """
+        Encola una fila. Si la cola esta llena espera (solo con block=True)
+        y luego lanza BufferFull. Desde el event loop va block=False.
+        """
+        self.start()
+        try:
+            if block:
+                self._queue.put((kind, row), timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait((kind, row))
+        except queue.Full:
+            self._count("rejected")
+            raise BufferFull()
+        self._count("enqueued")
+
+    def stop(self, timeout: float = 30):
+        """
+        Deja de esperar nuevos lotes, guarda lo que quede en la cola y termina
+        el hilo. Si la BD sigue caida despues de 'timeout' se deja de reintentar.
+        """
+        self._give_up_at = time.monotonic() + timeout
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # Si el hilo nunca arranco (o ya murio) vaciamos aqui
+        if self._thread is None or not self._thread.is_alive():
+            while not self._queue.empty():
+                self._flush(self._collect())
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self) -> list:
+        """Junta hasta max_batch filas o lo que llegue en flush_interval."""
+        wait = 0 if self._stopping.is_set() else self.flush_interval
+        try:
+            batch = [self._queue.get(timeout=wait) if wait else self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: list):
+        if not batch:
+            return
+        started = time.perf_counter()
+        outcome = self._write_retrying(batch)
+        written = batch if outcome == _WRITTEN else []
+        if outcome == _BAD_DATA:
+            # El lote no entro por sus datos: fila por fila para solo tirar las malas
+            for item in batch:
+                row_outcome = self._write_retrying([item])
+                if row_outcome == _WRITTEN:
+                    written.append(item)
+                elif row_outcome == _BAD_DATA:
+                    self._count("dropped")
+                    print(f"ADVERTENCIA: se descarto un resultado write-behind: {item}")
+                else:
+                    self._drop_unavailable([item])
+        elif outcome == _GAVE_UP:
+            self._drop_unavailable(batch)
+
+        if written:
+            db = SessionLocal()
+            try:
+                record_leaderboards(db, written)
+            except Exception as e:
+                # Ya estan en la BD; el refresco periodico de las tablas los recoge
+                print(f"Error actualizando tablas de posiciones tras write-behind: {e}")
+            finally:
+                db.close()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._metrics_lock:
+            self._metrics["flushes"] += 1
+            self._metrics["last_batch_size"] = len(batch)
+            self._metrics["last_flush_ms"] = round(elapsed_ms, 2)
+            self._metrics["max_flush_ms"] = round(max(self._metrics["max_flush_ms"], elapsed_ms), 2)
+            self._metrics["total_flush_ms"] += elapsed_ms
+
+    def _drop_unavailable(self, batch: list):
+        self._count("dropped", len(batch))
+        print(f"ADVERTENCIA: se apago sin BD, se descartaron {len(batch)} resultados write-behind")
+
+    def _write_retrying(self, batch: list) -> str:
+        """
+        Guarda el lote; si la BD no esta disponible lo reintenta (con espera
+        creciente hasta max_backoff) hasta que entre o se acabe el tiempo de
+        apagado. Regresa _WRITTEN, _BAD_DATA o _GAVE_UP.
+        """
+        attempt = 0
+        while True:
+            outcome = self._write(batch)
+            if outcome != _UNAVAILABLE:
+                break
+            if self._give_up_at is not None and time.monotonic() >= self._give_up_at:
+                outcome = _GAVE_UP
+                break
+            # Siguen pendientes (no descartadas) mientras la BD vuelve
+            self._set_pending(len(batch))
+            time.sleep(min(0.1 * 2 ** attempt, self.max_backoff))
+            attempt += 1
+        self._set_pending(0)
+        return outcome
+
+    def _write(self, batch: list) -> str:
+        db = SessionLocal()
+        try:
+            write_results(db, batch)
+            self._count("written", len(batch))
+            return _WRITTEN
+        except Exception as e:
+            try:
+                db.rollback()
+            except Exception:
+                pass  # con la conexion caida el rollback tambien falla
+            self._count("failed_flushes")
+            print(f"Error guardando lote write-behind ({len(batch)} filas): {e}")
+            return _UNAVAILABLE if _is_unavailable(e) else _BAD_DATA
+        finally:
+            db.close()
+
+    def _set_pending(self, rows: int):
+        with self._metrics_lock:
+            self._metrics["pending"] = rows
+
+    def _count(self, name: str, amount: int = 1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        flushes = metrics.pop("flushes")
+        total_flush_ms = metrics.pop("total_flush_ms")
+        return {
+            "enabled": True,
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "max_batch": self.max_batch,
+            "flush_ms": int(self.flush_interval * 1000),
+            "flushes": flushes,
+            "avg_flush_ms": round(total_flush_ms / flushes, 2) if flushes else 0.0,
+            **metrics,
+        }
+
+
+_buffer = WriteBehindBuffer(
+    WRITE_BEHIND_MAX_QUEUE,
+    WRITE_BEHIND_MAX_BATCH,
+    WRITE_BEHIND_FLUSH_MS,
+    WRITE_BEHIND_PUT_TIMEOUT_MS,
+    WRITE_BEHIND_MAX_BACKOFF_MS,
+) if WRITE_BEHIND else None
+
+
+def get_buffer():
+    """El buffer si WRITE_BEHIND esta activo, si no None (escritura directa)."""
+    return _buffer
+
+
+def set_buffer(buffer):
+    """Cambia el buffer (ej. en pruebas o benchmarks); None lo desactiva."""
+    global _buffer
+    _buffer = buffer
+
+
+def get_metrics() -> dict:
+    if _buffer is None:
+        return {"enabled": False}
+    return _buffer.metrics()
+
+
+def shutdown():
+    """Vacia la cola antes de apagar (se llama desde el lifespan)."""
+    if _buffer is not None:
+        _buffer.stop()
@@ -0,0 +1,42 @@
+"""
+Llena (o repara) las tablas user_stats y user_daily_activity recalculando
+los totales y el resumen diario de cada usuario desde quiz_attempts,
+memory_runs y user_module_progress.
+
+Correr una vez al desplegar la tabla (o si se sospecha que los totales se
+desfasaron). Un usuario sin fila la recibe en su primera escritura, pero
+hasta entonces /stats/summary le muestra ceros. Usa la BD de DATABASE_URL.
+Desde la raiz:
+
+    python scripts/backfill_user_stats.py            # todos los usuarios
+    python scripts/backfill_user_stats.py uid1 uid2  # solo esos usuarios
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import models
+from app.database import engine, SessionLocal
+from app.crud import stats as crud_stats
+
+
+def main():
+    user_ids = sys.argv[1:] or None
+    models.Base.metadata.create_all(bind=engine, tables=[
+        models.UserStats.__table__, models.UserDailyActivity.__table__,
+    ])
+
+    db = SessionLocal()
+    try:
+        written = crud_stats.rebuild_user_stats(db, user_ids=user_ids)
+        days = crud_stats.rebuild_daily_activity(db, user_ids=user_ids)
+        db.commit()
+    finally:
+        db.close()
+    print(f"user_stats: {written} usuario(s) recalculado(s)")
+    print(f"user_daily_activity: {days} dia(s) recalculado(s)")
+
+
+if __name__ == "__main__":
+    main()
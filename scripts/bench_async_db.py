@@ -0,0 +1,190 @@
+"""
+Compara el throughput de los endpoints mas usados con el motor sync
+(threadpool de Starlette, 40 hilos) y con el motor async (ASYNC_DB=1,
+event loop) bajo muchas peticiones concurrentes.
+
+Cada modo corre en su propio proceso (el motor se elige al importar la app)
+con una BD SQLite temporal y la app en memoria via httpx.ASGITransport,
+asi que mide la app y no la red. Necesita aiosqlite para el modo async.
+Ejecutar desde la raiz:
+
+    python scripts/bench_async_db.py
+    python scripts/bench_async_db.py --concurrency 500 --requests 4000
+
+Con mas peticiones en vuelo que hilos del threadpool (40) el modo sync
+puede trabarse: los hilos esperan una conexion del pool mientras las
+peticiones que tienen conexion esperan un hilo para serializar, y salen
+errores por timeout del pool (30 s). El modo async no tiene ese limite.
+
+Ojo: SQLite serializa las escrituras; para numeros de produccion correrlo
+con DATABASE_URL apuntando a un MySQL de pruebas (con asyncmy instalado).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+NUM_SIGNS = 500
+NUM_MODULES = 10
+QUIZZES_PER_MODULE = 3
+QUESTIONS_PER_QUIZ = 5
+
+# (nombre, metodo, ruta, cuerpo, requiere_auth)
+ENDPOINTS = [
+    ("deck", "GET", "/memory/deck?size=8", None, False),
+    ("fuzzy", "GET", "/dictionary/?query=sena1&mode=fuzzy", None, False),
+    ("quiz", "GET", "/quizzes/1", None, False),
+    ("attempt", "POST", "/quizzes/attempt", {"quiz_id": 1, "score": 0, "total": 0, "answers": {"1": "a"}}, True),
+]
+
+
+def seed(models, engine, SessionLocal):
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        signs = [
+            models.Sign(word=f"sena{i}", category=f"cat{i % 8}", video_path=f"videos/{i}.m4v", tags=["bench"])
+            for i in range(NUM_SIGNS)
+        ]
+        db.add_all(signs)
+        for m in range(NUM_MODULES):
+            module = models.Module(title=f"Modulo {m}", code=f"MOD-{m:02d}", sort_order=m)
+            module.quizzes = [
+                models.Quiz(
+                    title=f"Quiz {q}",
+                    type="multiple_choice",
+                    questions=[
+                        models.QuizQuestion(prompt=f"Pregunta {n}", options={"a": "x", "b": "y"}, answer="a")
+                        for n in range(QUESTIONS_PER_QUIZ)
+                    ],
+                )
+                for q in range(QUIZZES_PER_MODULE)
+            ]
+            db.add(module)
+        db.flush()
+        db.add_all([models.SignPair(word=sign.word, sign_id=sign.id) for sign in signs])
+        db.commit()
+    finally:
+        db.close()
+
+
+def make_token(set_local_keys):
+    import jwt
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("ascii")
+    set_local_keys({"bench": public_pem})
+    now = int(time.time())
+    claims = {"sub": "bench-user", "email": "bench@example.com", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": "bench"})
+
+
+async def run_endpoint(client, method, path, body, headers, concurrency, total):
+    """Lanza 'total' peticiones con 'concurrency' en vuelo; regresa (req/s, latencias ms, errores)."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return total / elapsed, latencies, errors
+
+
+async def bench_child(concurrency, total):
+    import httpx
+
+    sys.path.insert(0, ROOT)
+    from app import models
+    from app.database import engine, SessionLocal, AsyncSessionLocal
+    from app.dependencies import set_local_keys
+    from app.main import app
+
+    if os.environ.get("ASYNC_DB") == "1" and AsyncSessionLocal is None:
+        raise SystemExit("ASYNC_DB=1 pero falta el driver async (pip install aiosqlite)")
+
+    seed(models, engine, SessionLocal)
+    headers = {"Authorization": f"Bearer {make_token(set_local_keys)}"}
+    results = {}
+
+    async with app.router.lifespan_context(app):
+        # Los 500 (ej. timeout del pool) cuentan como errores en lugar de tumbar el benchmark
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, method, path, body, needs_auth in ENDPOINTS:
+                request_headers = headers if needs_auth else None
+                # calentamos caches (indices, payloads, usuario conocido)
+                await run_endpoint(client, method, path, body, request_headers, 4, 20)
+                rps, latencies, errors = await run_endpoint(
+                    client, method, path, body, request_headers, concurrency, total
+                )
+                latencies.sort()
+                results[name] = {
+                    "rps": round(rps, 1),
+                    "p50": round(statistics.median(latencies), 1),
+                    "p95": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+                    "errors": errors,
+                }
+    print(json.dumps(results))
+
+
+def run_mode(async_db: bool, concurrency: int, total: int) -> dict:
+    env = dict(os.environ)
+    env["ASYNC_DB"] = "1" if async_db else "0"
+    if "DATABASE_URL" not in os.environ:
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", "--concurrency", str(concurrency), "--requests", str(total)],
+        env=env, capture_output=True, text=True,
+    )
+    if output.returncode != 0:
+        raise SystemExit(f"Fallo el modo {'async' if async_db else 'sync'}:\n{output.stdout}{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(bench_child(args.concurrency, args.requests))
+        return
+
+    sync_results = run_mode(False, args.concurrency, args.requests)
+    async_results = run_mode(True, args.concurrency, args.requests)
+
+    print(f"{args.requests} peticiones por endpoint, {args.concurrency} concurrentes\n")
+    print(f"{'endpoint':<10} {'sync req/s':>11} {'p50':>7} {'p95':>7}   {'async req/s':>11} {'p50':>7} {'p95':>7}  {'errores':>8}")
+    for name, *_ in ENDPOINTS:
+        s, a = sync_results[name], async_results[name]
+        print(
+            f"{name:<10} {s['rps']:>11} {s['p50']:>7} {s['p95']:>7}   "
+            f"{a['rps']:>11} {a['p50']:>7} {a['p95']:>7}  {s['errors']:>3}/{a['errors']:<3}"
+        )
+
+
+if __name__ == "__main__":
+    main()
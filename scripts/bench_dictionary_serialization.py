@@ -0,0 +1,93 @@
+"""
+Micro-benchmark de serializacion del diccionario (543 señas).
+
+Compara el camino normal (objetos ORM + validacion Pydantic + JSONResponse)
+contra el camino rapido (columnas Core -> dicts -> bytes JSON) y revisa
+que ambos produzcan el mismo documento. Ejecutar desde la raiz:
+
+    python scripts/bench_dictionary_serialization.py
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app import models, schemas
+from app.database import engine, SessionLocal
+from app.crud import dictionary as crud_dictionary
+from app.serialization import dumps, orjson
+
+NUM_SIGNS = 543
+ROUNDS = 200
+
+_signs_adapter = TypeAdapter(List[schemas.Sign])
+
+
+def seed(db):
+    models.Base.metadata.create_all(bind=engine)
+    db.add_all([
+        models.Sign(
+            word=f"seña {i:03d}",
+            category=f"categoria {i % 12}",
+            video_path=f"videos/LSM_Web/sena_{i:03d}_Web.m4v",
+            tags=["lsm", f"tag{i % 7}"],
+        )
+        for i in range(NUM_SIGNS)
+    ])
+    db.commit()
+
+
+def orm_path(db) -> bytes:
+    # Lo que hace FastAPI con response_model=List[schemas.Sign]
+    signs = crud_dictionary.get_signs(db, skip=0, limit=NUM_SIGNS)
+    validated = _signs_adapter.validate_python(signs, from_attributes=True)
+    content = jsonable_encoder(_signs_adapter.dump_python(validated, mode="json"))
+    return JSONResponse(content).body
+
+
+def fast_path(db) -> bytes:
+    return dumps(crud_dictionary.get_signs_fast(db, skip=0, limit=NUM_SIGNS))
+
+
+def bench(label, func):
+    db = SessionLocal()
+    try:
+        func(db) # calentamiento
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            db.expunge_all() # cada peticion usa una sesion nueva
+            func(db)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    per_request = elapsed / ROUNDS * 1000
+    print(f"{label:<14} {per_request:>7.2f} ms/peticion  ({ROUNDS / elapsed:.0f} req/s)")
+    return per_request
+
+
+def main():
+    db = SessionLocal()
+    try:
+        seed(db)
+        assert json.loads(orm_path(db)) == json.loads(fast_path(db)), "Las respuestas no coinciden"
+    finally:
+        db.close()
+
+    print(f"{NUM_SIGNS} señas, encoder rapido: {'orjson' if orjson else 'json (stdlib)'}")
+    slow = bench("ORM+Pydantic", orm_path)
+    fast = bench("rapido", fast_path)
+    print(f"aceleracion: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de firmado de URLs de video (frio vs caliente).
+
+Usa un backend de storage falso que firma con RSA igual que Firebase,
+asi que no necesita credenciales ni red. Ejecutar desde la raiz:
+
+    python scripts/bench_media_signing.py
+"""
+import os
+import sys
+import time
+import tempfile
+import base64
+
+# Usamos una BD SQLite temporal para no tocar la real
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'bench.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives import hashes
+
+from app import models
+from app.database import engine, SessionLocal
+from app.storage import StorageBackend
+from app.crud import media as crud_media
+
+NUM_SIGNS = 543
+NUM_REQUESTS = 5000
+
+_private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class FakeStorageBackend(StorageBackend):
+    name = "fake"
+
+    def sign_url(self, path, expiration):
+        # Firmamos con RSA-SHA256 como lo hace google-cloud-storage (V4)
+        expires = int(time.time() + expiration.total_seconds())
+        payload = f"GET\n/{path}\n{expires}".encode("utf-8")
+        signature = _private_key.sign(payload, padding.PKCS1v15(), hashes.SHA256())
+        sig = base64.urlsafe_b64encode(signature).decode("ascii")
+        return f"https://storage.example.com/{path}?Expires={expires}&Signature={sig}"
+
+
+def seed(db):
+    models.Base.metadata.create_all(bind=engine)
+    db.add_all([
+        models.Sign(word=f"sena{i}", category="bench", video_path=f"videos/bench/{i}.m4v")
+        for i in range(1, NUM_SIGNS + 1)
+    ])
+    db.commit()
+
+
+def run(db, label):
+    start = time.perf_counter()
+    for i in range(NUM_REQUESTS):
+        sign_id = (i % NUM_SIGNS) + 1
+        assert crud_media.get_signed_video_url(db, sign_id=sign_id)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {NUM_REQUESTS / elapsed:>10.0f} req/s  ({elapsed * 1000:.1f} ms)")
+
+
+def main():
+    crud_media.set_storage_backend(FakeStorageBackend())
+    db = SessionLocal()
+    try:
+        seed(db)
+
+        # Frio: vaciamos el cache antes de cada peticion
+        start = time.perf_counter()
+        for i in range(NUM_REQUESTS // 10):
+            crud_media.clear_caches()
+            crud_media.get_signed_video_url(db, sign_id=(i % NUM_SIGNS) + 1)
+        elapsed = time.perf_counter() - start
+        cold_rate = (NUM_REQUESTS // 10) / elapsed
+        print(f"{'frio':<8} {cold_rate:>10.0f} req/s  ({elapsed * 1000:.1f} ms, {NUM_REQUESTS // 10} peticiones)")
+
+        # Caliente: el primer recorrido llena el cache, luego todo son hits
+        crud_media.clear_caches()
+        run(db, "caliente")
+        print(crud_media.get_cache_stats())
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
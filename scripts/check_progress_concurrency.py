@@ -0,0 +1,100 @@
+"""
+Manda muchas actualizaciones de progreso al mismo tiempo (varios hilos,
+cada uno con su sesion) y revisa que:
+
+  - el percent final de cada modulo sea el mayor que se envio (nunca baja)
+  - user_stats.mastered_modules cuente cada modulo al 100% una sola vez
+
+Usa una BD SQLite temporal. Ejecutar desde la raiz:
+
+    python scripts/check_progress_concurrency.py
+
+Sale con codigo 1 si algo no cuadra.
+"""
+import os
+import sys
+import random
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'concurrency.db')}"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import models, schemas
+from app.database import engine, SessionLocal
+from app.crud import progress as crud_progress
+
+NUM_MODULES = 10
+NUM_WORKERS = 8
+UPDATES_PER_WORKER = 50
+BATCH_SIZE = 4
+USER_ID = "concurrency-user"
+
+
+def seed():
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(models.User(uid=USER_ID, email="concurrency@example.com"))
+        db.add_all([models.Module(title=f"Modulo {m}", code=f"MOD-{m:02d}") for m in range(NUM_MODULES)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def worker(seed_value: int) -> list:
+    """Manda actualizaciones sueltas y por lote; regresa todo lo que envio."""
+    rng = random.Random(seed_value)
+    sent = []
+    db = SessionLocal()
+    try:
+        for _ in range(UPDATES_PER_WORKER):
+            items = [
+                schemas.UserModuleProgressCreate(module_id=rng.randint(1, NUM_MODULES), percent=rng.choice([0, 25, 50, 75, 100]))
+                for _ in range(rng.choice([1, BATCH_SIZE]))
+            ]
+            if len(items) == 1:
+                crud_progress.upsert_user_progress(db, USER_ID, items[0])
+            else:
+                crud_progress.upsert_progress_batch(db, USER_ID, items)
+            sent.extend(items)
+    finally:
+        db.close()
+    return sent
+
+
+def main():
+    seed()
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as pool:
+        sent = [item for items in pool.map(worker, range(NUM_WORKERS)) for item in items]
+
+    expected = {}
+    for item in sent:
+        expected[item.module_id] = max(item.percent, expected.get(item.module_id, 0))
+
+    db = SessionLocal()
+    try:
+        saved = {row.module_id: row.percent for row in crud_progress.get_user_progress(db, USER_ID)}
+        stats = db.get(models.UserStats, USER_ID)
+        mastered = stats.mastered_modules if stats else 0
+    finally:
+        db.close()
+
+    failures = 0
+    if saved != expected:
+        failures += 1
+        print(f"FALLA percent: esperado {expected}, guardado {saved}")
+    expected_mastered = sum(1 for percent in expected.values() if percent == 100)
+    if mastered != expected_mastered:
+        failures += 1
+        print(f"FALLA mastered_modules: esperado {expected_mastered}, guardado {mastered}")
+
+    print(f"{len(sent)} actualizaciones desde {NUM_WORKERS} hilos, {len(expected)} modulos")
+    if failures:
+        sys.exit(1)
+    print("Progreso consistente (percent monotono y modulos dominados sin duplicar)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Revisa cuantas consultas SQL hace cada endpoint y falla si alguno se
+pasa de su presupuesto (para detectar N+1 antes de desplegar).
+
+Usa una BD SQLite temporal con datos de prueba y tokens firmados con
+llaves locales, asi que no necesita Firebase. Ejecutar desde la raiz:
+
+    python scripts/check_query_budget.py
+
+Sale con codigo 1 si algun endpoint se pasa del presupuesto.
+"""
+import os
+import sys
+import time
+import tempfile
+
+# BD temporal y version del catalogo sin re-lecturas durante la prueba
+_tmp_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'budget.db')}"
+os.environ["CATALOG_VERSION_TTL"] = "3600"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import models
+from app.database import engine, SessionLocal
+from app.dependencies import set_local_keys
+from app.main import app
+
+NUM_MODULES = 26
+LESSONS_PER_MODULE = 4
+QUIZZES_PER_MODULE = 3
+QUESTIONS_PER_QUIZ = 5
+NUM_SIGNS = 60
+
+# (metodo, ruta, cuerpo, requiere_auth) -> maximo de consultas permitidas
+BUDGETS = [
+    (("GET", "/modules/?limit=100", None, False), 2),
+    (("GET", "/modules/?after=&limit=100", None, False), 2),
+    (("GET", "/lessons/?module_id=1", None, False), 1),
+    (("GET", "/quizzes/?module_id=1", None, False), 1),
+    (("GET", "/quizzes/1", None, False), 0),
+    (("GET", "/dictionary/?limit=50", None, False), 1),
+    (("GET", "/dictionary/?query=sena&mode=fuzzy", None, False), 1),
+    (("GET", "/dictionary/categories", None, False), 0),
+    (("GET", "/catalog", None, False), 0),
+    (("GET", "/memory/deck?size=12", None, False), 1),
+    (("GET", "/memory/deck?size=4&category=cat1", None, False), 1),
+    (("GET", "/missions/daily", None, True), 0),
+    (("GET", "/progress", None, True), 1),
+    (("GET", "/quizzes/my-attempts", None, True), 1),
+    (("GET", "/stats/summary", None, True), 3),
+    (("GET", "/stats/activity?days=30", None, True), 1),
+    (("GET", "/leaderboard?period=weekly", None, True), 1),
+    (("GET", "/leaderboard?period=all&module_id=1", None, False), 1),
+    # Escrituras: INSERT + UPSERT de user_stats y del resumen diario + SELECT del registro creado
+    (("POST", "/quizzes/attempt", {"quiz_id": 1, "score": 0, "total": 0, "answers": {"1": "a"}}, True), 4),
+    (("POST", "/memory/attempt", {"matches": 4, "attempts": 6, "duration_ms": 1000}, True), 4),
+    # UPSERT nativo + lectura del resultado (al 100% se suman INSERT IGNORE y UPDATE)
+    (("POST", "/progress", {"module_id": 1, "percent": 60}, True), 2),
+    (("POST", "/progress", {"module_id": 2, "percent": 100}, True), 4),
+    (("POST", "/progress/batch", {"items": [
+        {"module_id": 3, "percent": 40}, {"module_id": 4, "percent": 70},
+    ]}, True), 2),
+    (("POST", "/sync/results", {"items": [
+        {"kind": "quiz_attempt", "client_id": "budget-q", "quiz_id": 1, "answers": {"1": "a"}},
+        {"kind": "memory_run", "client_id": "budget-m", "matches": 4, "attempts": 6, "duration_ms": 1000},
+    ]}, True), 1),
+]
+
+
+def seed():
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        signs = [
+            models.Sign(word=f"sena{i}", category=f"cat{i % 5}", video_path=f"videos/{i}.m4v", tags=["prueba"])
+            for i in range(NUM_SIGNS)
+        ]
+        db.add_all(signs)
+        for m in range(NUM_MODULES):
+            module = models.Module(title=f"Modulo {m}", code=f"MOD-{m:02d}", sort_order=m)
+            module.lessons = [models.Lesson(title=f"Leccion {l}", sort_order=l) for l in range(LESSONS_PER_MODULE)]
+            module.quizzes = [
+                models.Quiz(
+                    title=f"Quiz {q}",
+                    type="multiple_choice",
+                    questions=[
+                        models.QuizQuestion(prompt=f"Pregunta {n}", options={"a": "x", "b": "y"}, answer="a")
+                        for n in range(QUESTIONS_PER_QUIZ)
+                    ],
+                )
+                for q in range(QUIZZES_PER_MODULE)
+            ]
+            db.add(module)
+        db.flush()
+        db.add_all([models.SignPair(word=sign.word, sign_id=sign.id) for sign in signs])
+        db.commit()
+    finally:
+        db.close()
+
+
+def make_token():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("ascii")
+    set_local_keys({"budget": public_pem})
+    now = int(time.time())
+    claims = {"sub": "budget-user", "email": "budget@example.com", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": "budget"})
+
+
+def main():
+    seed()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    failures = 0
+    with TestClient(app, raise_server_exceptions=False) as client:
+        headers = {"Authorization": f"Bearer {make_token()}"}
+
+        # Calentamos caches de proceso (usuario conocido, version del catalogo,
+        # indices del diccionario) para medir el estado estable
+        for (method, path, body, needs_auth), _ in BUDGETS:
+            client.request(method, path, json=body, headers=headers if needs_auth else None)
+
+        print(f"{'endpoint':<45} {'consultas':>9} {'max':>4}")
+        for (method, path, body, needs_auth), budget in BUDGETS:
+            statements.clear()
+            response = client.request(method, path, json=body, headers=headers if needs_auth else None)
+            count = len(statements)
+            status = "OK" if count <= budget and response.status_code < 400 else "FALLA"
+            if status != "OK":
+                failures += 1
+            print(f"{method + ' ' + path:<45} {count:>9} {budget:>4}  {status} ({response.status_code})")
+            if status != "OK" and os.getenv("VERBOSE"):
+                for statement in statements:
+                    print("    ", " ".join(statement.split())[:140])
+
+    if failures:
+        print(f"\n{failures} endpoint(s) fuera de presupuesto")
+        sys.exit(1)
+    print("\nTodos los endpoints dentro de presupuesto")
+
+
+if __name__ == "__main__":
+    main()